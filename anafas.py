@@ -30,13 +30,14 @@ class Anafas:
   Representa um arquivo/caso do Anafas.
   """
 
-  def __init__(self, file):
+  def __init__(self, file = None, encoding = None):
 
     # inicializa cartões vazios
     self.dbar = []
     self.dcir = []
 
-    self.__read(file)
+    if file is not None:
+      self.__read(file, encoding)
 
   def __iscomment(self, line):
     """
@@ -109,71 +110,58 @@ class Anafas:
 
     return card
 
-  def __read(self, file):
+  def __read(self, file, encoding = None):
     """
     Lê arquivo do Anafas e extrai dados de barras e circuitos.
     """
-    # lê dados de barras
-    self.__read_dbar(file)
+    for record in self.records(file, encoding = encoding):
+      if isinstance(record, DBar):
+        self.dbar.append(record)
+      else:
+        self.dcir.append(record)
 
-    # lê dados de circuitos
-    self.__read_dcir(file)
-
-  def __read_dbar(self, file):
+  def records(self, file, cards = ("DBAR", "DCIR"), encoding = None):
     """
-    Lê o cartão DBAR
+    Percorre o arquivo uma única vez, gerando os registros (DBar/DCir) dos
+    cartões pedidos na ordem em que aparecem no arquivo, sem armazená-los.
+
+    Com `encoding`, o arquivo é lido em modo binário, em blocos, e as colunas
+    são interpretadas diretamente como bytes; apenas os nomes de barra são
+    decodificados, com a codificação indicada. Codificações multibyte (como
+    utf-8) deslocariam as colunas; nesse caso, as linhas são decodificadas
+    inteiras, em modo texto.
     """
-    with open(file) as f:
-      inDbar = False
-      lastcard = ""
-      validrows = 0
-
-      for line in f:
-        newcard = self.__getCard(line, lastcard, validrows)
-        inDbar  = (newcard == "DBAR")
-
-        if not (newcard == lastcard):
-          validrows = 0
+    if encoding is None or not is_single_byte(encoding):
+      with open_file(file, encoding = encoding) as f:
+        yield from self.__records(f, cards, {"DBAR": DBar, "DCIR": DCir})
 
-        else:
-          added = False
-          if inDbar and not(self.__iscomment(line)):
-            # linha de dados válida dentro do cartão DBAR
-            self.dbar.append(DBar(line))
-            added = True
+    else:
+      parsers = {"DBAR": lambda line: DBar(line, encoding), "DCIR": DCir}
+      yield from self.__records(binary_lines(file), cards, parsers, binary = True)
 
-          if not self.__iscomment(line):
-            validrows = validrows + 1
+  def __records(self, lines, cards, parsers, binary = False):
+    lastcard = ""
+    validrows = 0
 
-        lastcard = newcard
+    for line in lines:
+      # cartões e comentários são identificados pelas 5 primeiras colunas
+      head = line[0:5]
+      if binary:
+        head = head.decode("latin-1")
 
-  def __read_dcir(self, file):
-    """
-    Lê o cartão DCIR
-    """
-    with open(file) as f:
-      inDcir = False
-      lastcard = ""
-      validrows = 0
+      newcard = self.__getCard(head, lastcard, validrows)
 
-      for line in f:
-        newcard = self.__getCard(line, lastcard, validrows)
-        inDcir  = (newcard == "DCIR")
+      if not (newcard == lastcard):
+        validrows = 0
 
-        if not (newcard == lastcard):
-          validrows = 0
+      elif not self.__iscomment(head):
+        if newcard in cards:
+          # linha de dados válida dentro de um cartão pedido
+          yield parsers[newcard](line)
 
-        else:
-          added = False
-          if inDcir and not(self.__iscomment(line)):
-            # linha de dados válida dentro do cartão DCIR
-            self.dcir.append(DCir(line))
-            added = True
+        validrows = validrows + 1
 
-          if not self.__iscomment(line):
-            validrows = validrows + 1
-
-        lastcard = newcard
+      lastcard = newcard
 
 
 class DBar:
@@ -194,11 +182,11 @@ class DBar:
   DEFAULT_VBAS = 500      # tensão base padrão em caso de erro de leitura
 
 
-  def __init__(self, line=""):
+  def __init__(self, line="", encoding="latin-1"):
     self.nb = 0
     self.nome = ""
     self.vbase = 500.0
-    self.__parse(line)
+    self.__parse(line, encoding)
 
   def __str__(self):
     return "Barra #{0} {1} de {2} kV".format(self.nb, self.nome, self.vbase)
@@ -206,11 +194,21 @@ class DBar:
   def __repr__(self):
     return self.__str__()
 
-  def __parse(self, line):
+  def __parse(self, line, encoding="latin-1"):
     """
     Interpreta linha de cartão. Utiliza índices contidos nas tuplas/constantes
-    COLS_NB, COLS_BN, COLS_VBAS
+    COLS_NB, COLS_BN, COLS_VBAS. A linha pode ser str ou bytes; neste caso o
+    nome da barra é decodificado com `encoding`.
     """
+    if len(line) >= self.COLS_VBAS[1]:
+      # linha completa: todas as colunas presentes
+      self.nb    = try_int(line[self.COLS_NB[0] : self.COLS_NB[1] + 1])
+      self.nome  = line[self.COLS_BN[0] : self.COLS_BN[1] + 1]
+      self.vbase = try_float(line[self.COLS_VBAS[0] : self.COLS_VBAS[1] + 1])
+      if isinstance(self.nome, bytes):
+        self.nome = self.nome.decode(encoding)
+      return
+
     line_end = False
 
     # número da barra
@@ -228,6 +226,8 @@ class DBar:
       start = self.COLS_BN[0]
       end   = self.COLS_BN[1] + 1
       self.nome = line[start : end]
+      if isinstance(self.nome, bytes):
+        self.nome = self.nome.decode(encoding)
 
     else:
       self.nome = self.DEFAULT_BN
@@ -288,6 +288,17 @@ class DCir:
     Interpreta linha de cartão. Utiliza índices contidos nas tuplas/constantes
     COLS_BF, COLS_BT, COLS_NC, COLS_R1, COLS_X1, COLS_R0, COLS_X0
     """
+    if len(line) >= self.COLS_X0[1]:
+      # linha completa: todas as colunas presentes
+      self.de   = try_int(line[self.COLS_BF[0] : self.COLS_BF[1] + 1])
+      self.para = try_int(line[self.COLS_BT[0] : self.COLS_BT[1] + 1])
+      self.num  = try_int(line[self.COLS_NC[0] : self.COLS_NC[1] + 1])
+      self.r1 = try_anafas_float(line[self.COLS_R1[0] : self.COLS_R1[1] + 1])
+      self.x1 = try_anafas_float(line[self.COLS_X1[0] : self.COLS_X1[1] + 1])
+      self.r0 = try_anafas_float(line[self.COLS_R0[0] : self.COLS_R0[1] + 1])
+      self.x0 = try_anafas_float(line[self.COLS_X0[0] : self.COLS_X0[1] + 1])
+      return
+
     line_end = False
 
     # barra de
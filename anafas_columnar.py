@@ -0,0 +1,171 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Exportação colunar (Arrow IPC, Parquet ou NumPy .npz) das tabelas de barras e
+circuitos de um caso do Anafas.
+
+Arrow IPC e Parquet geram um arquivo por tabela (caso.dbar.arrow e
+caso.dcir.arrow); o .npz guarda as duas tabelas com colunas prefixadas por
+"dbar_" e "dcir_". Os arquivos Arrow IPC não são comprimidos e podem ser lidos
+sem cópia com pyarrow.memory_map.
+"""
+
+from convert import *
+import os
+
+try:
+  import pyarrow
+  import pyarrow.ipc
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
+# colunas e tipos das tabelas exportadas
+DBAR_COLUMNS = [
+  ("nb",     "int64"),
+  ("nome",   "string"),
+  ("vbase",  "float64"),
+]
+
+DCIR_COLUMNS = [
+  ("de",     "int64"),
+  ("para",   "int64"),
+  ("num",    "int64"),
+  ("r1",     "float64"),   # impedâncias do Anafas (%)
+  ("x1",     "float64"),
+  ("r0",     "float64"),
+  ("x0",     "float64"),
+  ("kind",   "int8"),      # classificação CL_* de convert.py
+  ("trnum",  "int64"),     # número do trafo fictício (0 se não houver)
+  ("vbase",  "float64"),   # tensão base usada na conversão (kV)
+  ("r1_atp", "float64"),   # valores convertidos para o ATP (ohms ou mH)
+  ("x1_atp", "float64"),
+  ("r0_atp", "float64"),
+  ("x0_atp", "float64"),
+]
+
+
+def dbar_columns(ana):
+  return {
+    "nb":    [dbar.nb for dbar in ana.dbar],
+    "nome":  [dbar.nome for dbar in ana.dbar],
+    "vbase": [dbar.vbase for dbar in ana.dbar],
+  }
+
+
+def dcir_columns(ana, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0):
+  """
+  Colunas dos circuitos, incluindo a classificação e os valores ôhmicos
+  calculados da mesma forma que em __convertSources. Circuitos ignorados
+  recebem NaN nos valores convertidos.
+  """
+  buses  = busTable(ana.dbar)
+  factor = impedanceFactor(xopt, freq)
+  kinds  = [classifyCircuit(dcir, buses, Zmax) for dcir in ana.dcir]
+
+  columns = {name: [] for name, dtype in DCIR_COLUMNS}
+  for dcir, kind, trnum in zip(ana.dcir, kinds, transformerNumbers(kinds)):
+    if CL_SOURCE == kind:
+      node = dcir.para if dcir.de == 0 else dcir.de
+      vbase = buses.get(node, UNKNOWN_BUS)[1]
+      values = ohmicValues(dcir, vbase, sbase, factor)
+    elif kind in SERIES_KINDS:
+      vbase = buses.get(dcir.de, UNKNOWN_BUS)[1]
+      values = ohmicValues(dcir, vbase, sbase, factor)
+    else:
+      vbase = float("nan")
+      values = (float("nan"),) * 4
+
+    row = (dcir.de, dcir.para, dcir.num, dcir.r1, dcir.x1, dcir.r0, dcir.x0,
+           kind, trnum, vbase) + tuple(values)
+    for (name, dtype), value in zip(DCIR_COLUMNS, row):
+      columns[name].append(value)
+
+  return columns
+
+
+def __arrow_table(columns, schema):
+  return pyarrow.table({name: pyarrow.array(columns[name], getattr(pyarrow, dtype)())
+                        for name, dtype in schema})
+
+
+def __numpy_arrays(prefix, columns, schema):
+  return {prefix + name: numpy.array(columns[name], dtype = "U" if dtype == "string" else dtype)
+          for name, dtype in schema}
+
+
+def export_columnar(ana, filename, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0):
+  """
+  Exporta o caso no formato indicado pela extensão de `filename`: .arrow ou
+  .feather (Arrow IPC), .parquet ou .npz. Sem pyarrow instalado, qualquer
+  extensão é gravada como .npz. Retorna a lista de arquivos gravados.
+  """
+  tables = [
+    ("dbar", dbar_columns(ana), DBAR_COLUMNS),
+    ("dcir", dcir_columns(ana, Zmax, sbase, xopt, freq), DCIR_COLUMNS),
+  ]
+
+  base, ext = os.path.splitext(filename)
+  ext = ext.lower()
+
+  if pyarrow is None or ext == ".npz":
+    if numpy is None:
+      raise ImportError("exportação colunar requer pyarrow ou numpy")
+
+    arrays = {}
+    for name, columns, schema in tables:
+      arrays.update(__numpy_arrays(name + "_", columns, schema))
+
+    outfile = base + ".npz"
+    numpy.savez(outfile, **arrays)
+    return [outfile]
+
+  written = []
+  for name, columns, schema in tables:
+    table = __arrow_table(columns, schema)
+    outfile = "{}.{}{}".format(base, name, ext)
+
+    if ext == ".parquet":
+      pyarrow.parquet.write_table(table, outfile)
+    else:
+      with pyarrow.OSFile(outfile, "wb") as sink:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+          writer.write_table(table)
+
+    written.append(outfile)
+
+  return written
+
+
+if __name__ == "__main__":
+  from sys import argv
+  if len(argv) == 3:
+    print(export_columnar(Anafas(argv[1]), argv[2]))
+  else:
+    print("uso: anafas_columnar.py <caso.ANA> <caso.arrow|caso.parquet|caso.npz>")
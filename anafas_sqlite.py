@@ -0,0 +1,129 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Exportação de casos do Anafas para SQLite e carga a partir do banco.
+
+Exemplo de consulta (circuitos em 440 kV com Z0 acima de 5 pu):
+
+  SELECT dcir.* FROM dcir JOIN dbar ON dbar.nb = dcir.de
+  WHERE dbar.vbase = 440 AND dcir.z0 > 5
+"""
+
+from anafas import *
+import math
+import sqlite3
+
+SCHEMA = """
+DROP TABLE IF EXISTS dbar;
+DROP TABLE IF EXISTS dcir;
+
+CREATE TABLE dbar (
+  id    INTEGER PRIMARY KEY,  -- ordem no arquivo
+  nb    INTEGER,              -- número da barra
+  nome  TEXT,                 -- nome da barra
+  vbase REAL                  -- tensão base (kV)
+);
+
+CREATE TABLE dcir (
+  id    INTEGER PRIMARY KEY,  -- ordem no arquivo
+  de    INTEGER,              -- barra DE
+  para  INTEGER,              -- barra PARA
+  num   INTEGER,              -- número do circuito
+  r1    REAL,                 -- impedâncias em %
+  x1    REAL,
+  r0    REAL,
+  x0    REAL,
+  z1    REAL,                 -- módulo da impedância de seq+ (pu)
+  z0    REAL                  -- módulo da impedância de seq 0 (pu)
+);
+"""
+
+# índices criados após a carga, que é mais rápido que mantê-los na inserção
+INDEXES = """
+CREATE INDEX dbar_nb ON dbar (nb);
+CREATE INDEX dbar_vbase ON dbar (vbase);
+CREATE INDEX dcir_de_para ON dcir (de, para);
+CREATE INDEX dcir_para ON dcir (para);
+"""
+
+
+def export_sqlite(ana, dbfile):
+  """
+  Grava as barras e circuitos de um caso do Anafas em um banco SQLite,
+  substituindo tabelas existentes.
+  """
+  pu = lambda r, x: math.sqrt((r / 100.0)**2 + (x / 100.0)**2)
+
+  con = sqlite3.connect(dbfile)
+  try:
+    with con:
+      con.executescript(SCHEMA)
+      con.executemany("INSERT INTO dbar (nb, nome, vbase) VALUES (?, ?, ?)",
+        ((dbar.nb, dbar.nome, dbar.vbase) for dbar in ana.dbar))
+      con.executemany("INSERT INTO dcir (de, para, num, r1, x1, r0, x0, z1, z0) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((dcir.de, dcir.para, dcir.num, dcir.r1, dcir.x1, dcir.r0, dcir.x0,
+          pu(dcir.r1, dcir.x1), pu(dcir.r0, dcir.x0)) for dcir in ana.dcir))
+      con.executescript(INDEXES)
+
+  finally:
+    con.close()
+
+
+def load_sqlite(dbfile, where = None, params = ()):
+  """
+  Monta um caso do Anafas a partir do banco. O filtro opcional `where`
+  (cláusula SQL sobre a tabela dcir, com parâmetros em `params`) permite
+  carregar apenas parte dos circuitos. Todas as barras são carregadas.
+  """
+  ana = Anafas()
+
+  con = sqlite3.connect(dbfile)
+  try:
+    for nb, nome, vbase in con.execute("SELECT nb, nome, vbase FROM dbar ORDER BY id"):
+      dbar = DBar()
+      dbar.nb, dbar.nome, dbar.vbase = nb, nome, vbase
+      ana.dbar.append(dbar)
+
+    query = "SELECT de, para, num, r1, x1, r0, x0 FROM dcir"
+    if where:
+      query = query + " WHERE " + where
+    query = query + " ORDER BY id"
+
+    for de, para, num, r1, x1, r0, x0 in con.execute(query, params):
+      dcir = DCir()
+      dcir.de, dcir.para, dcir.num = de, para, num
+      dcir.r1, dcir.x1, dcir.r0, dcir.x0 = r1, x1, r0, x0
+      ana.dcir.append(dcir)
+
+  finally:
+    con.close()
+
+  return ana
+
+
+if __name__ == "__main__":
+  from sys import argv
+  if len(argv) == 3:
+    export_sqlite(Anafas(argv[1]), argv[2])
+  else:
+    print("uso: anafas_sqlite.py <caso.ANA> <caso.db>")
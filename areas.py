@@ -0,0 +1,150 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Saída dividida por áreas: um arquivo por área, incluído por um arquivo
+principal com cartões $INCLUDE.
+"""
+
+from topology import *
+import convert
+import os
+
+BY_VOLTAGE = "voltage"    # áreas por tensão base
+BY_RANGE   = "range"      # áreas por faixa de números de barra
+BY_ISLAND  = "island"     # áreas por ilha elétrica
+
+
+def circuitAreas(ldcir, buses, by = BY_VOLTAGE, size = 1000):
+  """
+  Nome da área de cada circuito. A área é definida pela barra DE (ou pela
+  barra da fonte), de modo que os trafos fictícios ficam junto de seu ramo.
+  """
+  nodes = [dcir.de if dcir.de != 0 else dcir.para for dcir in ldcir]
+
+  if BY_VOLTAGE == by:
+    return ["v" + "{:g}".format(buses.get(node, UNKNOWN_BUS)[1]).replace(".", "_") for node in nodes]
+
+  elif BY_RANGE == by:
+    return ["b{}".format(node // size * size) for node in nodes]
+
+  elif BY_ISLAND == by:
+    return ["i{}".format(label) for label in circuitIslands(ldcir, findIslands(ldcir))]
+
+  raise ValueError("partição desconhecida: {}".format(by))
+
+
+def __writeIfChanged(outfile, content):
+  """
+  Grava o arquivo apenas se o conteúdo mudou. Retorna True se gravou.
+  """
+  if os.path.exists(outfile):
+    with open_file(outfile, "r") as f:
+      if f.read() == content:
+        return False
+
+  with open_file(outfile, "w") as f:
+    f.write(content)
+
+  return True
+
+
+def __includedFiles(master):
+  """
+  Arquivos (no mesmo diretório) incluídos por um arquivo principal gravado
+  anteriormente por writeAreas, ou lista vazia se ele não existe.
+  """
+  if not os.path.exists(master):
+    return []
+
+  included = []
+  with open_file(master, "r") as f:
+    for line in f:
+      if line.startswith("$INCLUDE, "):
+        areafile = line[len("$INCLUDE, "):].strip()
+        if areafile == os.path.basename(areafile):
+          included.append(areafile)
+
+  return included
+
+
+def __writeArea(outfile, items, buses, suggestions, sbase, factor, style):
+  """
+  Converte os circuitos de uma área (fontes e depois ramos) e grava o arquivo.
+  """
+  sources = [circuitCards(dcir, kind, buses, suggestions, sbase, factor, trnum, style)
+             for index, dcir, kind, trnum in items if CL_SOURCE == kind]
+  series  = [circuitCards(dcir, kind, buses, suggestions, sbase, factor, trnum, style)
+             for index, dcir, kind, trnum in items if kind in SERIES_KINDS]
+
+  return __writeIfChanged(outfile, "".join(sources + series))
+
+
+def writeAreas(ana, outdir, name = "deck", by = BY_VOLTAGE, size = 1000, suggestions = None,
+               Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0, workers = 1):
+  """
+  Grava um arquivo por área em `outdir` e o arquivo principal "<name>.pch"
+  com um $INCLUDE por área. A numeração dos trafos fictícios é global. Só
+  são regravados os arquivos cujo conteúdo mudou, e as áreas incluídas pelo
+  arquivo principal anterior que deixaram de existir são apagadas. Retorna
+  a lista de arquivos gravados.
+  """
+  buses  = busTable(ana.dbar)
+  factor = impedanceFactor(xopt, freq)
+  kinds  = [classifyCircuit(dcir, buses, Zmax) for dcir in ana.dcir]
+  labels = circuitAreas(ana.dcir, buses, by, size)
+
+  groups = groupCircuits(ana.dcir, kinds, labels, buses)
+  areafiles = ["{}_{}.pch".format(name, label) for label, items, areabuses in groups]
+  tasks = [(os.path.join(outdir, areafile), items, areabuses, suggestions, sbase, factor, convert.md)
+           for areafile, (label, items, areabuses) in zip(areafiles, groups)]
+
+  changed = mapGroups(__writeArea, tasks, workers)
+  written = [task[0] for task, areachanged in zip(tasks, changed) if areachanged]
+
+  # áreas incluídas pelo arquivo principal anterior, para apagar as que deixaram de existir
+  master = os.path.join(outdir, name + ".pch")
+  stale = __includedFiles(master)
+
+  if __writeIfChanged(master, "".join("$INCLUDE, {}\n".format(areafile) for areafile in areafiles)):
+    written.append(master)
+
+  for areafile in stale:
+    if areafile not in areafiles and os.path.exists(os.path.join(outdir, areafile)):
+      os.remove(os.path.join(outdir, areafile))
+
+  return written
+
+
+if __name__ == "__main__":
+  from sys import argv
+  myargs = getopts(argv)
+  if '-i' in myargs and '-o' in myargs:
+    os.makedirs(myargs['-o'], exist_ok = True)
+    written = writeAreas(Anafas(myargs['-i']), myargs['-o'], myargs.get('-n', "deck"),
+                         by = myargs.get('-by', BY_VOLTAGE), size = int(myargs.get('-size', 1000)),
+                         workers = int(myargs.get('-j', 1)))
+    for outfile in written:
+      print(outfile)
+
+  else:
+    print("uso: areas.py -i <caso.ANA> -o <diretório> [-n <nome>] [-by voltage|range|island] [-size 1000] [-j <processos>]")
@@ -0,0 +1,114 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Comparação de desempenho entre a leitura em modo texto e a leitura binária
+de arquivos do Anafas.
+
+Uso: benchmark.py [-i <caso.ANA>] [-n <circuitos>] [-r <repetições>]
+Sem -i, um caso sintético com -n circuitos é gerado em um arquivo temporário.
+"""
+
+from convert import *
+import os
+import random
+import tempfile
+import time
+
+
+def syntheticBuses(ncir):
+  return max(2, ncir // 3)
+
+
+def syntheticCase(ncir, seed = 0):
+  """
+  Texto de um caso do Anafas com ncir circuitos e ncir/3 barras.
+  """
+  rand = random.Random(seed)
+  nbar = syntheticBuses(ncir)
+  volts = ["13.8", "138", "230", "345", "440", "500"]
+
+  # o cartão TITU é fechado (e consumido) pela primeira linha após o título
+  lines = ["TITU\n", "CASO SINTETICO\n", "\n", "DBAR\n"]
+  for nb in range(1, nbar + 1):
+    lines.append("{:>5}    {:<12}          {:>4}\n".format(nb, "BARRA {}".format(nb), rand.choice(volts)))
+  lines.append("99999\n")
+
+  lines.append("DCIR\n")
+  for icir in range(ncir):
+    de   = rand.randint(0, nbar)
+    para = rand.randint(1, nbar)
+    values = ["{:.2f}".format(rand.random() * 50) for i in range(4)]
+    lines.append("{:>5}  {:>5}  {:>2} {:>6}{:>6}{:>6}{:>6}\n".format(de, para, 1, *values))
+  lines.append("99999\n")
+  lines.append("FIM\n")
+
+  return "".join(lines)
+
+
+def timeit(function, repeat):
+  best = None
+  for i in range(repeat):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  return best
+
+
+def benchmarkParse(filename, repeat = 3):
+  """
+  Melhor tempo (s) de leitura nos modos texto e binário.
+  """
+  text   = timeit(lambda: Anafas(filename), repeat)
+  binary = timeit(lambda: Anafas(filename, "latin-1"), repeat)
+  return text, binary
+
+
+if __name__ == "__main__":
+  from sys import argv
+  myargs = getopts(argv)
+  repeat = int(myargs.get('-r', 3))
+
+  if '-i' in myargs:
+    filename = myargs['-i']
+    temporary = False
+  else:
+    with tempfile.NamedTemporaryFile("w", suffix = ".ANA", delete = False) as f:
+      f.write(syntheticCase(int(myargs.get('-n', 200000))))
+    filename = f.name
+    temporary = True
+
+  try:
+    ana = Anafas(filename)
+    if temporary:
+      assert len(ana.dbar) == syntheticBuses(int(myargs.get('-n', 200000))), "barras do caso sintético não lidas"
+
+    text, binary = benchmarkParse(filename, repeat)
+    print("{}: {} bytes, {} barras, {} circuitos".format(filename, os.path.getsize(filename), len(ana.dbar), len(ana.dcir)))
+    print("texto:   {:.3f} s".format(text))
+    print("binário: {:.3f} s ({:.2f}x)".format(binary, text / binary))
+
+  finally:
+    if temporary:
+      os.remove(filename)
@@ -0,0 +1,144 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Geração em lote de casos de contingência N-1 (saída de uma linha ou trafo).
+"""
+
+from convert import *
+import convert
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+class Contingencies:
+  """
+  Casos N-1 de um único caso do Anafas. Os cartões do caso base são gerados
+  uma única vez; cada contingência reaproveita esses cartões, removendo o
+  elemento desligado e renumerando os trafos fictícios seguintes do mesmo
+  tipo, que são os únicos cartões gerados novamente.
+  """
+
+  def __init__(self, ana, suggestions = None, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0, style = None):
+    self.dcir   = ana.dcir
+    self.buses  = busTable(ana.dbar)
+    self.sbase  = sbase
+    self.factor = impedanceFactor(xopt, freq)
+    self.style  = convert.md if style is None else style
+
+    self.kinds  = [classifyCircuit(dcir, self.buses, Zmax) for dcir in self.dcir]
+    self.trnums = transformerNumbers(self.kinds)
+
+    # fontes: idênticas em todas as contingências
+    self.sources = "".join(circuitCards(dcir, kind, self.buses, suggestions, sbase, self.factor, 0, self.style)
+                           for dcir, kind in zip(self.dcir, self.kinds) if CL_SOURCE == kind)
+
+    # ramos do caso base, na ordem do DCIR, e seus índices no DCIR
+    self.outages = [index for index, kind in enumerate(self.kinds) if kind in SERIES_KINDS]
+    self.series  = [self.__cards(index, self.trnums[index]) for index in self.outages]
+
+    # ramos com os trafos de cada tipo renumerados (trnum - 1), gerados sob demanda
+    self.__shifted = {}
+
+  def __cards(self, index, trnum):
+    return circuitCards(self.dcir[index], self.kinds[index], self.buses, None, self.sbase, self.factor, trnum, self.style)
+
+  def __shiftedSeries(self, kind):
+    if kind not in self.__shifted:
+      self.__shifted[kind] = [self.__cards(index, self.trnums[index] - 1) if kind == self.kinds[index] else cards
+                              for index, cards in zip(self.outages, self.series)]
+
+    return self.__shifted[kind]
+
+  def deck(self, position):
+    """
+    Cartões (lista de strings) da contingência do ramo `position`, posição
+    na lista self.outages.
+    """
+    kind = self.kinds[self.outages[position]]
+    if CL_BRANCH == kind:
+      tail = self.series[position + 1:]
+    else:
+      tail = self.__shiftedSeries(kind)[position + 1:]
+
+    return [self.sources] + self.series[:position] + tail
+
+  def filename(self, position, prefix = "N1", ext = ".pch"):
+    dcir = self.dcir[self.outages[position]]
+    return "{}_{:05d}_{}_{}_C{}{}".format(prefix, position + 1, dcir.de, dcir.para, dcir.num, ext)
+
+  def write(self, position, outdir, prefix = "N1", ext = ".pch"):
+    outfile = os.path.join(outdir, self.filename(position, prefix, ext))
+    with open_file(outfile, "w") as outf:
+      outf.writelines(self.deck(position))
+
+    return outfile
+
+  def writeAll(self, outdir, positions = None, prefix = "N1", ext = ".pch", workers = 1):
+    """
+    Grava um deck por contingência (todas, por padrão) em `outdir`,
+    opcionalmente em processos paralelos. Retorna os arquivos gravados.
+    """
+    if positions is None:
+      positions = range(len(self.outages))
+    positions = list(positions)
+
+    if workers <= 1:
+      return [self.write(position, outdir, prefix, ext) for position in positions]
+
+    chunks = [positions[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers = workers, initializer = _initWorker, initargs = (self,)) as executor:
+      futures = [executor.submit(_writeChunk, chunk, outdir, prefix, ext) for chunk in chunks]
+      written = {}
+      for chunk, future in zip(chunks, futures):
+        written.update(zip(chunk, future.result()))
+
+    return [written[position] for position in positions]
+
+
+# contingências do processo de trabalho, recebidas uma única vez
+_worker = None
+
+
+def _initWorker(contingencies):
+  global _worker
+  _worker = contingencies
+
+
+def _writeChunk(positions, outdir, prefix, ext):
+  return [_worker.write(position, outdir, prefix, ext) for position in positions]
+
+
+if __name__ == "__main__":
+  from sys import argv
+  import time
+
+  myargs = getopts(argv)
+  if '-i' in myargs and '-o' in myargs:
+    start = time.time()
+    cases = Contingencies(Anafas(myargs['-i']))
+    os.makedirs(myargs['-o'], exist_ok = True)
+    written = cases.writeAll(myargs['-o'], workers = int(myargs.get('-j', 1)))
+    print("{} contingências em {:.1f} s".format(len(written), time.time() - start))
+
+  else:
+    print("uso: contingency.py -i <caso.ANA> -o <diretório> [-j <processos>]")
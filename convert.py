@@ -23,7 +23,12 @@ SOFTWARE.
 """
 
 from anafas import *
+from anafas_sqlite import load_sqlite
 import math
+import os
+import pickle
+import shutil
+import tempfile
 
 MD_HAMILTON = 0
 MD_SUELAINE = 1
@@ -36,10 +41,12 @@ def __empty_comment_line(COLUMN_WIDTH=80):
   return __insertRightWhitespace("C", COLUMN_WIDTH) + "\n"
 
 
-def __read_data_fformat(line, fields):
+def __read_data_fformat(line, fields, encoding = None):
   """
   Accepted format (Fortran format expecifier), ex:
   (I5, 1X, A5, 1X, A5, 1X, F4.1, A12)
+
+  When `line` is bytes, only the text (A) fields are decoded, with `encoding`.
   """
   data_extr = [None]*len(fields)
   charpos = 0
@@ -54,6 +61,8 @@ def __read_data_fformat(line, fields):
       data_extr[ifield] = int(fstr.strip())
     elif "A" == ftype:
       data_extr[ifield] = fstr.strip()
+      if isinstance(fstr, bytes):
+        data_extr[ifield] = data_extr[ifield].decode(encoding)
     elif "F" == ftype or "D" == ftype or "E" == ftype:
       data_extr[ifield] = float(fstr.strip())
     else:
@@ -114,31 +123,60 @@ class NameSuggestion:
     return self.__str__()
 
 
-def __read_name_suggestions(filename):
+def __read_name_suggestions(filename, encoding = None):
+  """
+  Lê o arquivo de sugestões de nomes. Com `encoding`, o arquivo é lido em
+  modo binário e apenas os campos de texto são decodificados (em modo texto,
+  se a codificação for multibyte; ver Anafas.records).
+  """
   fields = [[5, "I"], [1, "X"], [5, "A"], [1, "X"], [5, "A"], [1, "X"], [4, "F", 1], [12, "A"]]
 
   suggestions = []
-  with open(filename, "r") as file:
-    for line in file:
-      if "99999" != line[0:5]:
-        nbus, bfrom, bsrc, volt, bname = __read_data_fformat(line, fields)
+  if encoding is None or not is_single_byte(encoding):
+    with open_file(filename, "r", encoding) as file:
+      for line in file:
+        if "99999" != line[0:5]:
+          nbus, bfrom, bsrc, volt, bname = __read_data_fformat(line, fields)
+          suggestions.append(NameSuggestion(nbus, bfrom, bsrc, volt, bname))
+
+  else:
+    for line in binary_lines(filename):
+      if b"99999" != line[0:5]:
+        nbus, bfrom, bsrc, volt, bname = __read_data_fformat(line, fields, encoding)
         suggestions.append(NameSuggestion(nbus, bfrom, bsrc, volt, bname))
 
   return suggestions
 
 
-def __convertSources(ldcir, ldbar, suggestions = None, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0):
-  """
-  Busca elementos shunts na lista de circuitos.
-  """
-  GROUND = ""
+# classificação dos circuitos do Anafas
+CL_IGNORED   = 0    # circuito não convertido
+CL_SOURCE    = 1    # fonte (uma das barras é a terra)
+CL_BRANCH    = 2    # ramo entre barras de mesma tensão
+CL_BRANCH_YY = 3    # ramo + trafo fictício Y-Y (tensões diferentes)
+CL_BRANCH_DD = 4    # ramo + trafo fictício D-D (isolamento de seq 0)
 
-  branchcards = ""
+SERIES_KINDS = (CL_BRANCH, CL_BRANCH_YY, CL_BRANCH_DD)
 
-  calcz = lambda r, x: math.sqrt(r**2 + x**2)
+# barra inexistente no DBAR
+UNKNOWN_BUS = ("", 998.0)
 
-  mixnames = lambda prefix, name1, name2 : prefix[0] + name1[0:2] + name2[0:2]
 
+def calcz(r, x):
+  return math.sqrt(r**2 + x**2)
+
+
+def busTable(ldbar):
+  """
+  Tabela compacta de barras: número -> (nome, tensão base). Em caso de números
+  repetidos, prevalece a última barra do DBAR.
+  """
+  return {dbar.nb: (dbar.nome, dbar.vbase) for dbar in ldbar}
+
+
+def impedanceFactor(xopt = 60.0, freq = 60.0):
+  """
+  Fator aplicado às impedâncias ôhmicas do Anafas.
+  """
   if abs(xopt) <= 1E-3:
     """converter dados do Anafas em mH"""
     w = 2*math.pi*freq
@@ -147,118 +185,244 @@ def __convertSources(ldcir, ldbar, suggestions = None, Zmax = 5, sbase = 100, xo
     """converte da frequência do Anafas para a frequência do ATP."""
     factor = freq / xopt
 
-  for dcir in ldcir:
-    r1pu = dcir.r1 / 100.0 # % -> pu
-    x1pu = dcir.x1 / 100.0
-    r0pu = dcir.r0 / 100.0
-    x0pu = dcir.x0 / 100.0
+  return factor
+
+
+def classifyCircuit(dcir, buses, Zmax = 5):
+  """
+  Classifica um circuito (CL_*) conforme suas barras e impedâncias.
+  """
+  if (dcir.de == 0 and dcir.para != 0) or (dcir.para == 0 and dcir.de != 0):
+    # ignora elementos com impedância de seq+ maiores que determinado valor (em pu)
+    if calcz(dcir.r1 / 100.0, dcir.x1 / 100.0) < Zmax:
+      return CL_SOURCE
+
+  elif dcir.de > 0 and dcir.para > 0:
+    devbase   = buses.get(dcir.de, UNKNOWN_BUS)[1]
+    paravbase = buses.get(dcir.para, UNKNOWN_BUS)[1]
+    z0 = calcz(dcir.r0 / 100.0, dcir.x0 / 100.0)
+
+    if abs(paravbase - devbase) < 1E-3 and z0 < Zmax:
+      return CL_BRANCH
+    elif z0 < Zmax:
+      return CL_BRANCH_YY
+    else:
+      return CL_BRANCH_DD
+
+  return CL_IGNORED
+
+
+def transformerNumbers(kinds):
+  """
+  Numeração (a partir de 1) dos trafos fictícios de cada circuito, contada em
+  separado para trafos Y-Y e D-D. Circuitos sem trafo recebem 0.
+  """
+  count = {CL_BRANCH_YY: 0, CL_BRANCH_DD: 0}
+  numbers = []
+  for kind in kinds:
+    if kind in count:
+      count[kind] = count[kind] + 1
+      numbers.append(count[kind])
+    else:
+      numbers.append(0)
+
+  return numbers
+
+
+def ohmicValues(dcir, vbase, sbase = 100, factor = 1.0):
+  """
+  Converte r1, x1, r0 e x0 do circuito (em %) para ohms (ou mH) na tensão base.
+  """
+  zbase = ((vbase*1E3)**2)/(sbase*1E6)
+  r1 = dcir.r1 / 100.0 * zbase * factor
+  x1 = dcir.x1 / 100.0 * zbase * factor
+  r0 = dcir.r0 / 100.0 * zbase * factor
+  x0 = dcir.x0 / 100.0 * zbase * factor
+  return r1, x1, r0, x0
+
+
+def sourceNames(dcir, buses, suggestions = None):
+  """
+  Resolve nome e tensão da barra de uma fonte e os nós ATP de seus terminais.
+  """
+  if dcir.de == 0:
+    node = dcir.para
+  else:
+    node = dcir.de
+
+  nome, vbase = buses.get(node, UNKNOWN_BUS)
+
+  # sugestões de nomes para os nós
+  de, para = None, None
+  if None != suggestions:
+    # utiliza sugestões de nomes
+    suggs = list(filter(lambda x: (node == x.nbus) or nome.strip() in x.bname.strip(), suggestions))
+    if len(suggs) > 0:
+      de   = suggs[0].bsrc
+      para = suggs[0].bfrom
+
+  if None == de:
+    # cria nomes para os nós terminais
+    de   = __getSourceName(nome)
+    para = __getAtpName(nome)
+
+  return nome, vbase, de, para
+
+
+def printSource(nome, vbase, de, para, r1, x1, r0, x0, style = None, refs = None):
+  if style is None:
+    style = md
+
+  mystr = ""
+  if MD_HAMILTON == style:
+    mystr = mystr + "C    BARRA: {}".format(nome) + "\n"
+  elif MD_SUELAINE == style:
+    mystr = mystr + "C BARRA {} ({:6.2f} kV)".format(nome, vbase) + "\n"
+  mystr = mystr + printBranch(de, para, r1, x1, r0, x0, vbase, refs)
+  # mystr = mystr + __insertRightWhitespace("C ", 80) + "\n"
+  mystr = mystr + "C" + "\n"
+
+  return mystr
 
-    # Sources
-    if (dcir.de == 0 and dcir.para != 0) or (dcir.para == 0 and dcir.de != 0):
-      if dcir.de == 0:
-        node = dcir.para
-      else:
-        node = dcir.de
-
-      nome = ""
-      vbase = 998.0
-      for dbar in ldbar:
-        if dbar.nb == node:
-          nome  = dbar.nome
-          vbase = dbar.vbase
-
-      zbase = ((vbase*1E3)**2)/(sbase*1E6)
-
-      # sugestões de nomes para os nós
-      de, para = None, None
-      if None != suggestions:
-        # utiliza sugestões de nomes
-        suggs = list(filter(lambda x: (node == x.nbus) or nome.strip() in x.bname.strip(), suggestions))
-        if len(suggs) > 0:
-          de   = suggs[0].bsrc
-          para = suggs[0].bfrom
-
-      if None == de:
-        # cria nomes para os nós terminais
-        de   = __getSourceName(nome)
-        para = __getAtpName(nome)
-
-      # ignora elementos com impedância de seq+ maiores que determinado valor (em pu)
-      if calcz(r1pu, x1pu) < Zmax:
-        r1 = r1pu * zbase * factor
-        x1 = x1pu * zbase * factor
-        r0 = r0pu * zbase * factor
-        x0 = x0pu * zbase * factor
-        if MD_HAMILTON == md:
-          branchcards = branchcards + "C    BARRA: {}".format(nome) + "\n"
-        elif MD_SUELAINE == md:
-          branchcards = branchcards + "C BARRA {} ({:6.2f} kV)".format(nome, vbase) + "\n"
-        branchcards = branchcards + printBranch(de, para, r1, x1, r0, x0, vbase)
-        # branchcards = branchcards + __insertRightWhitespace("C ", 80) + "\n"
-        branchcards = branchcards + "C" + "\n"
+
+def printSeries(kind, denome, paranome, devbase, paravbase, r1, x1, r0, x0, trnum = 0, refs = None):
+  mixnames = lambda prefix, name1, name2 : prefix[0] + name1[0:2] + name2[0:2]
+
+  adenome   = __getAtpName(denome)
+  aparanome = __getAtpName(paranome)
+
+  mystr = ""
+  # caso 1: mesma tensão, sem isolamento de seq 0 (ramo)
+  if CL_BRANCH == kind:
+    mystr = mystr + "C BARRAS: {} - {} ({:6.2f} kV)".format(denome, paranome, devbase) + "\n"
+    mystr = mystr + printBranch(adenome, aparanome, r1, x1, r0, x0, devbase, refs)
+    mystr = mystr + __empty_comment_line()
+
+  # caso 2: tensões diferentes, sem isolamento de seq 0 (ramo + trafo Y-Y)
+  # caso 3: tensões iguais (ou diferentes), com isolamento de seq 0 (ramo + trafo D-D)
+  else:
+    dummynome = mixnames("T", adenome, aparanome)
+    conn = "y" if CL_BRANCH_YY == kind else "d"
+
+    # programa do Hamilton substitui r0 e x0 por 999.99 no caso 3
+
+    mystr = mystr + "C ENTRE A BARRA {} E O TRAFO FICTICIO NA BARRA {} ({:6.2f} kV)".format(denome, dummynome, devbase) + "\n"
+    mystr = mystr + printBranch(adenome, dummynome, r1, x1, r0, x0, devbase, refs)
+    mystr = mystr + __empty_comment_line()
+
+    mystr = mystr + printTransformer(dummynome, aparanome, devbase, paravbase, conn, conn, trnum, refs)
+
+  return mystr
+
+
+def circuitCards(dcir, kind, buses, suggestions = None, sbase = 100, factor = 1.0, trnum = 0, style = None, refs = None):
+  """
+  Cartões ATP de um único circuito já classificado (CL_*). Com `refs` (dicionário
+  compartilhado entre os circuitos, na ordem de saída), elementos repetidos são
+  escritos como referência ao primeiro elemento idêntico.
+  """
+  if CL_SOURCE == kind:
+    nome, vbase, de, para = sourceNames(dcir, buses, suggestions)
+    r1, x1, r0, x0 = ohmicValues(dcir, vbase, sbase, factor)
+    return printSource(nome, vbase, de, para, r1, x1, r0, x0, style, refs)
+
+  elif kind in SERIES_KINDS:
+    denome, devbase     = buses.get(dcir.de, UNKNOWN_BUS)
+    paranome, paravbase = buses.get(dcir.para, UNKNOWN_BUS)
+    r1, x1, r0, x0 = ohmicValues(dcir, devbase, sbase, factor)
+    return printSeries(kind, denome, paranome, devbase, paravbase, r1, x1, r0, x0, trnum, refs)
+
+  return ""
+
+
+def __convertSources(ldcir, ldbar, suggestions = None, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0, references = False):
+  """
+  Busca elementos shunts na lista de circuitos. Com `references`, ramos e
+  trafos repetidos são escritos como referência ao primeiro idêntico.
+  """
+  refs = {} if references else None
+  buses  = busTable(ldbar)
+  factor = impedanceFactor(xopt, freq)
+  kinds  = [classifyCircuit(dcir, buses, Zmax) for dcir in ldcir]
+
+  branchcards = []
+
+  # Sources
+  for dcir, kind in zip(ldcir, kinds):
+    if CL_SOURCE == kind:
+      branchcards.append(circuitCards(dcir, kind, buses, suggestions, sbase, factor, refs = refs))
 
   # ramos entre barras
-  trdcount = 0 # trafos d-d
-  trycount = 0 # trafos y-y
-  for dcir in ldcir:
-
-    r1pu = dcir.r1 / 100.0 # % -> pu
-    x1pu = dcir.x1 / 100.0
-    r0pu = dcir.r0 / 100.0
-    x0pu = dcir.x0 / 100.0
-
-    if (dcir.de > 0 and dcir.para > 0):
-      # Series
-      for dbar in ldbar:
-        if dbar.nb == dcir.de:
-          denome  = dbar.nome
-          devbase = dbar.vbase
-
-        if dbar.nb == dcir.para:
-          paranome  = dbar.nome
-          paravbase = dbar.vbase
-
-      adenome   = __getAtpName(denome)
-      aparanome = __getAtpName(paranome)
-
-      vbase = devbase
-      zbase = ((vbase*1E3)**2)/(sbase*1E6)
-      r1 = r1pu * zbase * factor
-      x1 = x1pu * zbase * factor
-      r0 = r0pu * zbase * factor
-      x0 = x0pu * zbase * factor
-
-      # caso 1: mesma tensão, sem isolamento de seq 0 (ramo)
-      if abs(paravbase - devbase) < 1E-3 and calcz(r0pu, x0pu) < Zmax:
-        branchcards = branchcards + "C BARRAS: {} - {} ({:6.2f} kV)".format(denome, paranome, devbase) + "\n"
-        branchcards = branchcards + printBranch(adenome, aparanome, r1, x1, r0, x0, devbase)
-        branchcards = branchcards + __empty_comment_line()
-
-      # caso 2: tensões diferentes, sem isolamento de seq 0 (ramo + trafo Y-Y)
-      elif calcz(r0pu, x0pu) < Zmax:
-        dummynome = mixnames("T", adenome, aparanome)
-
-        branchcards = branchcards + "C ENTRE A BARRA {} E O TRAFO FICTICIO NA BARRA {} ({:6.2f} kV)".format(denome, dummynome, devbase) + "\n"
-        branchcards = branchcards + printBranch(adenome, dummynome, r1, x1, r0, x0, devbase)
-        branchcards = branchcards + __empty_comment_line()
-
-        branchcards = branchcards + printTransformer(dummynome, aparanome, devbase, paravbase, "y", "y", trycount + 1)
-        trycount = trycount + 1
-
-      # caso 3: tensões iguais (ou diferentes), com isolamento de seq 0 (ramo + trafo D-D)
-      else:
-        dummynome = mixnames("T", adenome, aparanome)
+  for dcir, kind, trnum in zip(ldcir, kinds, transformerNumbers(kinds)):
+    if kind in SERIES_KINDS:
+      branchcards.append(circuitCards(dcir, kind, buses, suggestions, sbase, factor, trnum, refs = refs))
 
-        # programa do Hamilton substitui r0 e x0 por 999.99
+  return "".join(branchcards)
 
-        branchcards = branchcards + "C ENTRE A BARRA {} E O TRAFO FICTICIO NA BARRA {} ({:6.2f} kV)".format(denome, dummynome, devbase) + "\n"
-        branchcards = branchcards + printBranch(adenome, dummynome, r1, x1, r0, x0, devbase)
-        branchcards = branchcards + __empty_comment_line()
 
-        branchcards = branchcards + printTransformer(dummynome, aparanome, devbase, paravbase, "d", "d", trdcount + 1)
-        trdcount = trdcount + 1
+def convertStream(infile, outfile, suggestions = None, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0, references = False,
+                  encoding = None):
+  """
+  Converte o arquivo do Anafas em uma única passada, com memória limitada.
+  Mantém apenas a tabela de barras (o DBAR deve preceder o DCIR no arquivo;
+  caso contrário, gera ValueError) e converte cada circuito assim que é
+  lido. As fontes são escritas direto na saída e os ramos vão para um
+  arquivo temporário, anexado ao final, de modo que a ordem dos cartões é a
+  mesma de __convertSources. Em caso de erro, a saída parcial é apagada. Com `references`, os ramos só são convertidos
+  após todas as fontes, que podem lhes servir de referência, e o resultado
+  é idêntico ao de __convertSources. Com `encoding`, o arquivo é lido em
+  modo binário (ver Anafas.records).
+  """
+  refs   = {} if references else None
+  buses  = {}
+  factor = impedanceFactor(xopt, freq)
+  count  = {CL_BRANCH_YY: 0, CL_BRANCH_DD: 0}
+  seendcir = False
+
+  # com referências, o arquivo temporário guarda os circuitos (pickle), e não os cartões
+  try:
+    with open_file(outfile, "w") as outf, tempfile.TemporaryFile("w+b" if references else "w+") as seriesf:
+      for record in Anafas().records(infile, encoding = encoding):
+        if isinstance(record, DBar):
+          if seendcir:
+            raise ValueError("{}: DBAR após o DCIR; use a conversão sem -m stream".format(infile))
+          buses[record.nb] = (record.nome, record.vbase)
+          continue
+
+        seendcir = True
+
+        kind = classifyCircuit(record, buses, Zmax)
+        if CL_SOURCE == kind:
+          outf.write(circuitCards(record, kind, buses, suggestions, sbase, factor, refs = refs))
+
+        elif kind in SERIES_KINDS:
+          trnum = 0
+          if kind in count:
+            count[kind] = count[kind] + 1
+            trnum = count[kind]
+
+          if references:
+            pickle.dump((record, kind, trnum), seriesf)
+          else:
+            seriesf.write(circuitCards(record, kind, buses, suggestions, sbase, factor, trnum))
+
+      seriesf.seek(0)
+      if references:
+        while True:
+          try:
+            record, kind, trnum = pickle.load(seriesf)
+          except EOFError:
+            break
+          outf.write(circuitCards(record, kind, buses, suggestions, sbase, factor, trnum, refs = refs))
+      else:
+        shutil.copyfileobj(seriesf, outf)
 
-  return branchcards
+
+  except BaseException:
+    # não deixa uma saída truncada, que pareceria um deck válido
+    if os.path.exists(outfile):
+      os.remove(outfile)
+    raise
 
 
 def __getAtpName(name):
@@ -315,10 +479,45 @@ def __fixedWidthNumber(num, maxwidth):
   return snum
 
 
-def printBranch(de, para, r1, x1, r0, x0, vbase):
+def __findReference(refs, key, names, value):
+  """
+  Elemento de referência do ATP para um elemento com parâmetros `key`. Como
+  o ATP localiza a referência pelos nomes, cada nome em `names` é registrado
+  em `refs`, e um elemento só passa a servir de referência se nenhum elemento
+  anterior usou os mesmos nomes; se um elemento posterior os repetir, ele
+  deixa de servir. Retorna o `value` do elemento de referência, ou None se o
+  elemento deve ser escrito por completo.
+  """
+  unique = True
+  for name in names:
+    if ("NAME", name) in refs:
+      unique = False
+      # nome repetido: o elemento que o usava deixa de ser referência
+      owner = refs[("NAME", name)]
+      if owner is not None:
+        for ownername in refs.pop(owner)[1]:
+          refs[("NAME", ownername)] = None
+    refs[("NAME", name)] = None
+
+  if key in refs:
+    return refs[key][0]
+
+  if unique:
+    refs[key] = (value, names)
+    for name in names:
+      refs[("NAME", name)] = key
+
+  return None
+
+
+def printBranch(de, para, r1, x1, r0, x0, vbase, refs = None):
   """
   R: [27, 32]
   X: [33, 44]
+
+  Com `refs`, um ramo com os mesmos parâmetros de um ramo anterior é escrito
+  como ramo de referência do ATP (BUS3/BUS4 com os nós do primeiro ramo),
+  desde que o par de nós do primeiro ramo seja único (ver __findReference).
   """
   COLUMN_WIDTH = 80
 
@@ -329,6 +528,21 @@ def printBranch(de, para, r1, x1, r0, x0, vbase):
   sr0 = __fixedWidthNumber(r0,  6)
   sx0 = __fixedWidthNumber(x0, 12)
 
+  reference = None
+  if refs is not None:
+    pair = tuple(sorted((nomede + "A", nomepara + "A")))
+    reference = __findReference(refs, ("51", sr1, sx1, sr0, sx0), [("51",) + pair], (nomede, nomepara))
+
+  if reference is not None:
+    refde, refpara = reference
+    fields_ref = [["I", 2], ["A", 6], ["A", 6], ["A", 6], ["A", 6]]
+
+    mystr = __write_data_fformat([51, nomede + "A", nomepara + "A", refde + "A", refpara + "A"], fields_ref)
+    mystr = mystr + (" " * 18) + "       {{ EM {:>5.1f}KV".format(vbase) + "\n"
+    mystr = mystr + __write_data_fformat([52, nomede + "B", nomepara + "B", refde + "B", refpara + "B"], fields_ref) + "\n"
+    mystr = mystr + __write_data_fformat([53, nomede + "C", nomepara + "C", refde + "C", refpara + "C"], fields_ref) + "\n"
+    return mystr
+
   PHASE_A_MASK = "51{:6.6}{:6.6}            {:>6}{:>12}       {{ EM {:>6.2f} KV"
   PHASE_B_MASK = "52{:6.6}{:6.6}            {:>6}{:>12}"
   PHASE_C_MASK = "53{:6.6}{:6.6}"
@@ -351,7 +565,12 @@ def printBranch(de, para, r1, x1, r0, x0, vbase):
   return mystr
 
 
-def printTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum):
+def printTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum, refs = None):
+  """
+  Com `refs`, um trafo com as mesmas tensões e ligações de um trafo anterior
+  é escrito como referência ao bustop da fase A do primeiro, sem os dados
+  dos enrolamentos, desde que esse bustop seja único (ver __findReference).
+  """
   GROUND = ""
 
   R = ""
@@ -385,11 +604,26 @@ def printTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum):
   bustopB = BUSTOPY_MASK.format(bustopNum, "B")
   bustopC = BUSTOPY_MASK.format(bustopNum, "C")
 
+  # trafo de referência: fase A do primeiro trafo idêntico
+  # (o bustop de Y-Y e D-D de mesmo número coincide, e é truncado em 6 colunas)
+  refbus = None
+  if refs is not None:
+    bustops = [("TRANSFORMER", "{:6.6}".format(bustop)) for bustop in (bustopA, bustopB, bustopC)]
+    refbus = __findReference(refs, ("TRANSFORMER", vbaseDe, vbasePara, tipoDe, tipoPara), bustops, bustopA)
+
+  if refbus is not None:
+    # apenas os nós dos enrolamentos
+    WINDING_1_MASK = " 1{:6.6}{:6.6}"
+    WINDING_2_MASK = " 2{:6.6}{:6.6}"
+
   # mystr =         "C Transformador\n"
   mystr = ""
   # fase A
-  mystr = mystr + TRANSF_MASK.format("", bustopA) + "\n"
-  mystr = mystr + "            9999" + "\n"
+  if refbus is None:
+    mystr = mystr + TRANSF_MASK.format("", bustopA) + "\n"
+    mystr = mystr + "            9999" + "\n"
+  else:
+    mystr = mystr + TRANSF_MASK.format(refbus, bustopA) + "\n"
   # LV
   if tipoDe == "y":
     mystr = mystr + WINDING_1_MASK.format(nomede + "A", GROUND, R, X, vbaseDe) + "\n"
@@ -402,7 +636,7 @@ def printTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum):
     mystr = mystr + WINDING_2_MASK.format(nomepara + "A", nomepara + "B", R, X, vbasePara) + "\n"
 
   # fase B
-  mystr = mystr + TRANSF_MASK.format(bustopA, bustopB) + "\n"
+  mystr = mystr + TRANSF_MASK.format(refbus or bustopA, bustopB) + "\n"
   # LV
   if tipoDe == "y":
     mystr = mystr + WINDING_1_MASK.format(nomede + "B", GROUND, R, X, vbaseDe) + "\n"
@@ -415,7 +649,7 @@ def printTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum):
     mystr = mystr + WINDING_2_MASK.format(nomepara + "B", nomepara + "C", R, X, vbasePara) + "\n"
 
   # fase C
-  mystr = mystr + TRANSF_MASK.format(bustopA, bustopC) + "\n"
+  mystr = mystr + TRANSF_MASK.format(refbus or bustopA, bustopC) + "\n"
   # LV
   if tipoDe == "y":
     mystr = mystr + WINDING_1_MASK.format(nomede + "C", GROUND, R, X, vbaseDe) + "\n"
@@ -460,15 +694,28 @@ if __name__ == "__main__":
   from sys import argv
   myargs = getopts(argv)
   if '-i' in myargs and '-o' in myargs:
-    # input/processing
-    ana  = Anafas(myargs['-i'])
+    if myargs.get('-m') == "stream" and myargs['-i'].lower().endswith(".db"):
+      # o caso em SQLite já é lido por consulta, sem a passada única em texto
+      raise SystemExit("-m stream não se aplica a arquivos .db; omita -m para usar -w")
+
+    elif myargs.get('-m') == "stream":
+      # conversão em passada única, com memória limitada
+      convertStream(myargs['-i'], myargs['-o'], references = myargs.get('-r') == "1", encoding = myargs.get('-e'))
+
+    else:
+      # input/processing
+      if myargs['-i'].lower().endswith(".db"):
+        # caso exportado para SQLite, com filtro opcional sobre os circuitos
+        ana = load_sqlite(myargs['-i'], myargs.get('-w'))
+      else:
+        ana = Anafas(myargs['-i'], myargs.get('-e'))
 
-    # conversion
-    outp = __convertSources(ana.dcir, ana.dbar)
+      # conversion
+      outp = __convertSources(ana.dcir, ana.dbar, references = myargs.get('-r') == "1")
 
-    # output
-    with open(myargs['-o'], "w") as outf:
-      outf.write(outp)
+      # output
+      with open_file(myargs['-o'], "w") as outf:
+        outf.write(outp)
 
   else:
     suggestions = __read_name_suggestions("sp500-440/ESTREITO.DAT")
@@ -21,12 +21,22 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 
-Utilitary functions for field conversion.
+Utilitary functions for field conversion and file handling.
 """
 
+import bz2
+import codecs
+import gzip
+import lzma
+import os
+
+# compressed file openers, by extension and by magic bytes
+COMPRESSED_EXTENSIONS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+COMPRESSED_MAGIC = [(b"\x1f\x8b", gzip.open), (b"BZh", bz2.open), (b"\xfd7zXZ\x00", lzma.open)]
+
 def try_int(intstr):
   """
-  Try converting a string into int. Trims empty space.
+  Try converting a string (or bytes) into int. Trims empty space.
   """
   try:
     num = int(intstr.strip())
@@ -39,7 +49,7 @@ def try_int(intstr):
 
 def try_float(floatstr):
   """
-  Try converting a string into a float. Trims empty space.
+  Try converting a string (or bytes) into a float. Trims empty space.
   """
   try:
     num = float(floatstr.strip())
@@ -52,7 +62,7 @@ def try_float(floatstr):
 
 def try_anafas_float(floatstr):
   """
-  Try converting a string into a float. Trims empty space and checks whether
+  Try converting a string (or bytes) into a float. Trims empty space and checks whether
   there is a decimal separator. When a decimal separator is unspecified, assumes
   two decimals separators by default (Anafas' default) dividing the resulting
   number by 100.
@@ -61,11 +71,92 @@ def try_anafas_float(floatstr):
     num = float(floatstr.strip())
 
     # checks if the decimal separator was omitted
-    thereIsDot = not (floatstr.find(".") == -1)
+    dot = b"." if isinstance(floatstr, bytes) else "."
+    thereIsDot = not (floatstr.find(dot) == -1)
     if not thereIsDot:
       num = num / 100.0
 
   except ValueError:
     num = 0.0
 
-  return num
\ No newline at end of file
+  return num
+
+def is_single_byte(encoding):
+  """
+  Check whether an encoding maps every byte to exactly one character and is
+  ASCII compatible, so that fixed columns can be sliced directly from the
+  raw bytes (e.g. latin-1 or cp1252, but not utf-8 or utf-16).
+  """
+  if bytes(range(128)).decode(encoding, "replace") != "".join(map(chr, range(128))):
+    return False
+
+  decoder = codecs.getincrementaldecoder(encoding)()
+  for byte in range(128, 256):
+    try:
+      if decoder.decode(bytes([byte])) == "":
+        # the byte starts a multi-byte sequence
+        return False
+
+    except UnicodeDecodeError:
+      # byte undefined in a single-byte table
+      decoder.reset()
+
+  return True
+
+
+def open_file(filename, mode = "r", encoding = None):
+  """
+  Open a plain or compressed (gzip, bz2 or xz) file, streaming its contents.
+  Compression is detected from the file extension or, when reading, from the
+  file's magic bytes. Text modes behave as the built-in open().
+  """
+  opener = COMPRESSED_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+  if opener is None and "r" in mode:
+    with open(filename, "rb") as f:
+      head = f.read(6)
+
+    for magic, magic_opener in COMPRESSED_MAGIC:
+      if head.startswith(magic):
+        opener = magic_opener
+
+  if opener is None:
+    return open(filename, mode, encoding = encoding)
+
+  # compressed openers default to binary mode
+  if "b" not in mode and "t" not in mode:
+    mode = mode + "t"
+
+  return opener(filename, mode, encoding = encoding)
+
+
+def binary_lines(filename, chunksize = 1 << 20):
+  """
+  Read a (possibly compressed) file in binary mode, in large chunks, yielding
+  its lines as bytes. Line endings (CRLF, CR or LF) are translated to LF and
+  kept, as in text mode with universal newlines.
+  """
+  with open_file(filename, "rb") as f:
+    rest = b""
+    while True:
+      chunk = f.read(chunksize)
+      if not chunk:
+        break
+
+      buf = rest + chunk
+      # a trailing CR may be the first half of a CRLF
+      rest = b""
+      if buf.endswith(b"\r"):
+        buf, rest = buf[:-1], b"\r"
+
+      if b"\r" in buf:
+        buf = buf.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+      lines = buf.splitlines(True)
+      if lines and not lines[-1].endswith(b"\n"):
+        rest = lines.pop() + rest
+
+      yield from lines
+
+    if rest:
+      yield rest.replace(b"\r", b"\n")
@@ -0,0 +1,986 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Verificação de paridade entre as implementações atuais de leitura e escrita
+e uma cópia congelada das implementações originais (referência).
+
+Entradas aleatórias e casos de borda (campos em branco, decimais implícitos,
+linhas curtas, impedâncias muito grandes ou muito pequenas, comentários) são
+aplicados às duas versões, que devem produzir objetos e textos idênticos
+(ou o mesmo tipo de erro). Também é informada a razão de desempenho entre a
+referência e a versão atual.
+
+Os elementos de referência do ATP (-r 1) são verificados resolvendo cada
+referência como o ATP (ela deve apontar para um único elemento anterior com
+o nome referenciado) e comparando o resultado com a saída sem referências.
+A conversão em passada única com referências deve ser idêntica à conversão
+em memória.
+
+Uso: parity.py [-n <casos>] [-seed <semente>]
+"""
+
+from convert import *
+import convert
+import os
+import random
+import sys
+import tempfile
+import time
+
+fixedWidthNumber = getattr(convert, "__fixedWidthNumber")
+convertSources   = getattr(convert, "__convertSources")
+
+
+# ---------------------------------------------------------------------------
+# Implementação de referência, copiada sem alterações (exceto nomes) da
+# versão original de convert_utils.py, anafas.py e convert.py. Não otimizar.
+# ---------------------------------------------------------------------------
+
+def refTryInt(intstr):
+  """
+  Try converting a string into int. Trims empty space.
+  """
+  try:
+    num = int(intstr.strip())
+
+  except ValueError:
+    num = 0
+
+  return num
+
+
+def refTryFloat(floatstr):
+  """
+  Try converting a string into a float. Trims empty space.
+  """
+  try:
+    num = float(floatstr.strip())
+
+  except ValueError:
+    num = 0.0
+
+  return num
+
+
+def refTryAnafasFloat(floatstr):
+  """
+  Try converting a string into a float. Trims empty space and checks whether
+  there is a decimal separator. When a decimal separator is unspecified, assumes
+  two decimals separators by default (Anafas' default) dividing the resulting
+  number by 100.
+  """
+  try:
+    num = float(floatstr.strip())
+
+    # checks if the decimal separator was omitted
+    thereIsDot = not (floatstr.find(".") == -1)
+    if not thereIsDot:
+      num = num / 100.0
+
+  except ValueError:
+    num = 0.0
+
+  return num
+
+
+class RefAnafas:
+  """
+  Representa um arquivo/caso do Anafas.
+  """
+
+  def __init__(self, file):
+
+    # inicializa cartões vazios
+    self.dbar = []
+    self.dcir = []
+
+    self.__read(file)
+
+  def __iscomment(self, line):
+    """
+    Check if its a line comment
+    """
+    return line[0] == "("
+
+  def __getCard(self, line, lastcard = "", validrows = 0):
+    
+    card = lastcard
+    # no card were read
+    if lastcard == "":
+      # TIPO
+      if line[0:4] == "TIPO" or line[0:3] == "  0":
+        card = "TIPO"
+
+      # TITU
+      if line[0:4] == "TITU" or line[0:3] == "  1":
+        card = "TITU"
+
+      # CMNT
+      if line[0:4] == "CMNT" or line[0:3] == "  2":
+        card = "CMNT"
+
+      # BASE
+      if line[0:4] == "BASE" or line[0:3] == "100":
+        card = "BASE"
+
+      # DBAR
+      if line[0:4] == "DBAR" or line[0:3] == " 38":
+        card = "DBAR"
+
+      # DCIR
+      if line[0:4] == "DCIR" or line[0:3] == " 37":
+        card = "DCIR"
+
+      # DMUT
+      if line[0:4] == "DMUT" or line[0:3] == " 39":
+        card = "DMUT"
+
+      # DMOV
+      if line[0:4] == "DMOV" or line[0:3] == " 36":
+        card = "DMOV"
+
+      # DSHL
+      if line[0:4] == "DSHL" or line[0:3] == " 35":
+        card = "DSHL"
+
+      # DEOL
+      if line[0:4] == "DEOL":
+        card = "DEOL"
+
+      # DARE
+      if line[0:4] == "DARE":
+        card = "DARE"
+
+    elif (lastcard == "TIPO") or (
+          lastcard == "TITU") or (
+          lastcard == "CMNT") or (
+          lastcard == "BASE"):
+      # one valid row cards
+      if not self.__iscomment(line) and validrows == 1:
+        # read at least 1 valid row, then closes the card
+        card = ""
+
+    else:
+      # inside a multiple rows card (DBAR, DCIR, etc)
+      if line[0:5] == "99999":
+        card = ""
+
+    return card
+
+  def __read(self, file):
+    """
+    Lê arquivo do Anafas e extrai dados de barras e circuitos.
+    """
+    # lê dados de barras
+    self.__read_dbar(file)
+
+    # lê dados de circuitos
+    self.__read_dcir(file)
+
+  def __read_dbar(self, file):
+    """
+    Lê o cartão DBAR
+    """
+    with open(file) as f:
+      inDbar = False
+      lastcard = ""
+      validrows = 0
+
+      for line in f:
+        newcard = self.__getCard(line, lastcard, validrows)
+        inDbar  = (newcard == "DBAR")
+
+        if not (newcard == lastcard):
+          validrows = 0
+
+        else:
+          added = False
+          if inDbar and not(self.__iscomment(line)):
+            # linha de dados válida dentro do cartão DBAR
+            self.dbar.append(RefDBar(line))
+            added = True
+
+          if not self.__iscomment(line):
+            validrows = validrows + 1
+
+        lastcard = newcard
+
+  def __read_dcir(self, file):
+    """
+    Lê o cartão DCIR
+    """
+    with open(file) as f:
+      inDcir = False
+      lastcard = ""
+      validrows = 0
+
+      for line in f:
+        newcard = self.__getCard(line, lastcard, validrows)
+        inDcir  = (newcard == "DCIR")
+
+        if not (newcard == lastcard):
+          validrows = 0
+
+        else:
+          added = False
+          if inDcir and not(self.__iscomment(line)):
+            # linha de dados válida dentro do cartão DCIR
+            self.dcir.append(RefDCir(line))
+            added = True
+
+          if not self.__iscomment(line):
+            validrows = validrows + 1
+
+        lastcard = newcard
+
+
+class RefDBar:
+  """
+  Cartão do Anafas de dados de Barra.
+
+  Formato do cartão (versão 7.10):
+  (NB  CEM      BN               VBAS DISJUN          DDMMAAAADDMMAAAA IA SA  F
+  (----=-= ------------          ---- ------          --------======== ---=== -
+  """
+
+  COLS_NB   = ( 0,  4)    # número da barra
+  COLS_BN   = ( 9, 20)    # nome da barra
+  COLS_VBAS = (31, 34)    # tensão base da barra (kV)
+
+  DEFAULT_NB = 0          # número padrão de barra em caso de erro de leitura
+  DEFAULT_BN = "BARRA"    # nome padrão de barra em caso de erro de leitura
+  DEFAULT_VBAS = 500      # tensão base padrão em caso de erro de leitura
+
+
+  def __init__(self, line=""):
+    self.nb = 0
+    self.nome = ""
+    self.vbase = 500.0
+    self.__parse(line)
+
+  def __str__(self):
+    return "Barra #{0} {1} de {2} kV".format(self.nb, self.nome, self.vbase)
+
+  def __repr__(self):
+    return self.__str__()
+
+  def __parse(self, line):
+    """
+    Interpreta linha de cartão. Utiliza índices contidos nas tuplas/constantes
+    COLS_NB, COLS_BN, COLS_VBAS
+    """
+    line_end = False
+
+    # número da barra
+    if len(line) >= self.COLS_NB[1]:
+      start = self.COLS_NB[0]
+      end   = self.COLS_NB[1] + 1
+      self.nb = refTryInt(line[start : end])
+
+    else:
+      self.nb = self.DEFAULT_NB
+      line_end = True
+
+    # nome da barra
+    if not(line_end) and len(line) >= self.COLS_BN[1]:
+      start = self.COLS_BN[0]
+      end   = self.COLS_BN[1] + 1
+      self.nome = line[start : end]
+
+    else:
+      self.nome = self.DEFAULT_BN
+      line_end = True
+
+    # tensão base
+    if not(line_end) and len(line) >= self.COLS_VBAS[1]:
+      start = self.COLS_VBAS[0]
+      end   = self.COLS_VBAS[1] + 1
+      self.vbase = refTryFloat(line[start : end])
+
+    else:
+      self.vbase = self.DEFAULT_VBAS
+      line_end = True
+
+
+class RefDCir:
+  """
+  Cartão do Anafas de dados de Circuito.
+  """
+
+  COLS_BF = ( 0,  4)    # número da barra DE
+  COLS_BT = ( 7, 11)    # número da barra PARA
+  COLS_NC = (14, 15)    # número do circuito
+  COLS_R1 = (17, 22)    # resistência de sequência positiva
+  COLS_X1 = (23, 28)    # reatância de sequência positiva
+  COLS_R0 = (29, 34)    # resistência de sequência zero
+  COLS_X0 = (35, 40)    # reatância de sequência zero
+
+  DEFAULT_BF = 1    # número da barra DE padrão, em caso de erro de leitura
+  DEFAULT_BT = 2    # número da barra PARA padrão, em caso de erro de leitura
+  DEFAULT_NC = 1    # número do circuito padrão, em caso de erro de leitura
+  DEFAULT_R1 =  0.0  # resistência de sequência positiva padrão, em caso de erro de leitura
+  DEFAULT_X1 =  0.0  # reatância de sequência positiva padrão, em caso de erro de leitura
+  DEFAULT_R0 =  0.0  # resistência de sequência zero padrão, em caso de erro de leitura
+  DEFAULT_X0 =  0.0  # reatância de sequência zero padrão, em caso de erro de leitura
+
+
+  def __init__(self, line = ""):
+    self.de   = 0
+    self.para = 0
+    self.num  = 1
+    self.r1 = 0.0
+    self.x1 = 0.0
+    self.r0 = 0.0
+    self.x0 = 0.0
+    
+    self.__parse(line)
+
+  def __str__(self):
+    return "Circuito C{0} #{1}-{2}".format(self.num, self.de, self.para)
+
+  def __repr__(self):
+    return self.__str__()
+
+  def __parse(self, line):
+    """
+    Interpreta linha de cartão. Utiliza índices contidos nas tuplas/constantes
+    COLS_BF, COLS_BT, COLS_NC, COLS_R1, COLS_X1, COLS_R0, COLS_X0
+    """
+    line_end = False
+
+    # barra de
+    if len(line) >= self.COLS_BF[1]:
+      start = self.COLS_BF[0]
+      end   = self.COLS_BF[1] + 1
+      self.de = refTryInt(line[start : end])
+
+    else:
+      self.de = self.DEFAULT_BF
+      line_end = True
+
+    # barra para
+    if not(line_end) and len(line) >= self.COLS_BT[1]:
+      start = self.COLS_BT[0]
+      end   = self.COLS_BT[1] + 1
+      self.para = refTryInt(line[start : end])
+
+    else:
+      self.para = self.DEFAULT_BT
+      line_end = True
+
+    # número do circuito
+    if not(line_end) and len(line) >= self.COLS_NC[1]:
+      start = self.COLS_NC[0]
+      end   = self.COLS_NC[1] + 1
+      self.num = refTryInt(line[start : end])
+
+    else:
+      self.num = self.DEFAULT_NC
+      line_end = True
+
+    # Resistência de Sequência Positiva
+    if not(line_end) and len(line) >= self.COLS_R1[1]:
+      start = self.COLS_R1[0]
+      end   = self.COLS_R1[1] + 1
+      self.r1 = refTryAnafasFloat(line[start : end])
+
+    else:
+      self.r1 = self.DEFAULT_R1
+      line_end = True
+
+    # Reatância de Sequência Positiva
+    if not(line_end) and len(line) >= self.COLS_X1[1]:
+      start = self.COLS_X1[0]
+      end   = self.COLS_X1[1] + 1
+      self.x1 = refTryAnafasFloat(line[start : end])
+
+    else:
+      self.x1 = self.DEFAULT_X1
+      line_end = True
+
+    # Resistência de Sequência Zero
+    if not(line_end) and len(line) >= self.COLS_R0[1]:
+      start = self.COLS_R0[0]
+      end   = self.COLS_R0[1] + 1
+      self.r0 = refTryAnafasFloat(line[start : end])
+
+    else:
+      self.r0 = self.DEFAULT_R0
+      line_end = True
+
+    # Reatância de Sequência Zero
+    if not(line_end) and len(line) >= self.COLS_X0[1]:
+      start = self.COLS_X0[0]
+      end   = self.COLS_X0[1] + 1
+      self.x0 = refTryAnafasFloat(line[start : end])
+
+    else:
+      self.x0 = self.DEFAULT_X0
+      line_end = True
+
+
+def refWriteDataFformat(line, fields):
+  outstr = ""
+  ivalue = 0
+  for ifield in range(len(fields)):
+    value = line[ivalue]
+    ftype = fields[ifield][0]
+    width = fields[ifield][1]
+
+    if "X" != ftype:
+      fformat = ""
+      if "I" == ftype:
+        fformat = "{:>" + str(width) + "}"
+        value = int(value)
+      elif "A" == ftype:
+        fformat = "{:" + str(width) + "}"
+      elif "F" == ftype or "D" == ftype or "E" == ftype:
+        precision = fields[ifield][2]
+        fformat = "{:" + str(width) + "." + str(precision) + "f}"
+        value = float(value)
+      else:
+        fformat = "{:" + str(width) + "}"
+
+      outstr = outstr + fformat.format(value)
+      ivalue = ivalue + 1
+    else:
+      outstr = outstr + (" " * width)
+
+  return outstr
+
+
+def refFixedWidthNumber(num, maxwidth):
+  snum = str(num)
+  thereIsDot = snum.find(".")
+
+  if len(snum) > maxwidth:
+    snum = snum[0:maxwidth]
+  
+  # if decimal separator is lost...
+  # try scientific notation, reducing its precision until the width is met
+  if snum.find(".") == -1 and thereIsDot:
+
+    # case where the rounded number fit maxwidth
+    if len(str(int(math.floor(num)))) == maxwidth:
+      snum = str(int(math.floor(num)))
+    else:
+      # otherwise... try scientific notation
+      for iprec in range(maxwidth - 3, 0, -1):
+
+        snum = "{:.{precision}G}".format(num, precision=iprec)
+
+        if len(snum) <= maxwidth:
+          break
+
+  return snum
+
+
+def refPrintBranch(de, para, r1, x1, r0, x0, vbase):
+  """
+  R: [27, 32]
+  X: [33, 44]
+  """
+  COLUMN_WIDTH = 80
+
+  nomede   = str(de)
+  nomepara = str(para)
+  sr1 = refFixedWidthNumber(r1,  6)
+  sx1 = refFixedWidthNumber(x1, 12)
+  sr0 = refFixedWidthNumber(r0,  6)
+  sx0 = refFixedWidthNumber(x0, 12)
+
+  PHASE_A_MASK = "51{:6.6}{:6.6}            {:>6}{:>12}       {{ EM {:>6.2f} KV"
+  PHASE_B_MASK = "52{:6.6}{:6.6}            {:>6}{:>12}"
+  PHASE_C_MASK = "53{:6.6}{:6.6}"
+
+  phase_a = PHASE_A_MASK.format(nomede + "A", nomepara + "A", sr0, sx0, vbase)
+  phase_b = PHASE_B_MASK.format(nomede + "B", nomepara + "B", sr1, sx1)
+  phase_c = PHASE_C_MASK.format(nomede + "C", nomepara + "C")
+
+  fields_ab = [["I", 2], ["A", 6], ["A", 6], ["X", 12], ["F", 6, 2], ["F", 12, 2]]
+  fields_c = [["I", 2], ["A", 6], ["A", 6]]
+  phase_a_values = [51, nomede + "A", nomepara + "A", sr0, sx0]
+  phase_b_values = [52, nomede + "B", nomepara + "B", sr1, sx1]
+  phase_c_values = [53, nomede + "C", nomepara + "C"]
+  
+  mystr = refWriteDataFformat(phase_a_values, fields_ab)
+  mystr = mystr + "       {{ EM {:>5.1f}KV".format(vbase) + "\n"
+  mystr = mystr + refWriteDataFformat(phase_b_values, fields_ab) + "\n"
+  mystr = mystr + refWriteDataFformat(phase_c_values, fields_c) + "\n"
+
+  return mystr
+
+
+def refPrintTransformer(de, para, vbaseDe, vbasePara, tipoDe, tipoPara, bustopNum):
+  GROUND = ""
+
+  R = ""
+  X = "0.001"
+
+  nomede = de
+  nomepara = para
+
+  # parameters: REFBUS name (branco para bustop!=""), BUSTOP name
+  TRANSF_MASK = "  TRANSFORMER {:6.6}                  {:6.6}"
+  
+  # parameters: BUS1, BUS2, R12, X12, V12
+  WINDING_1_MASK = " 1{:6.6}{:6.6}           {:>6}{:>6}{:>7}"
+  WINDING_2_MASK = " 2{:6.6}{:6.6}           {:>6}{:>6}{:>7}"
+
+  # nome gerado para o bustop
+  BUSTOPD_MASK = "TRD{:>02}{}"
+  BUSTOPY_MASK = "TRY{:>02}{}"
+  BUSTOP_MASK = ""
+
+  # ramo monofásico para a terra
+  GROUND_RESIST_MASK = "  {:6.6}                  1.0E06"
+
+
+  if tipoDe == "y":
+    BUSTOP_MASK = BUSTOPY_MASK
+  else:
+    BUSTOP_MASK + BUSTOPD_MASK
+
+  bustopA = BUSTOPD_MASK.format(bustopNum, "A")
+  bustopB = BUSTOPY_MASK.format(bustopNum, "B")
+  bustopC = BUSTOPY_MASK.format(bustopNum, "C")
+
+  # mystr =         "C Transformador\n"
+  mystr = ""
+  # fase A
+  mystr = mystr + TRANSF_MASK.format("", bustopA) + "\n"
+  mystr = mystr + "            9999" + "\n"
+  # LV
+  if tipoDe == "y":
+    mystr = mystr + WINDING_1_MASK.format(nomede + "A", GROUND, R, X, vbaseDe) + "\n"
+  else:
+    mystr = mystr + WINDING_1_MASK.format(nomede + "A", nomede + "B", R, X, vbaseDe) + "\n"
+  # HV
+  if tipoPara == "y":
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "A", GROUND, R, X, vbasePara) + "\n"
+  else:
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "A", nomepara + "B", R, X, vbasePara) + "\n"
+
+  # fase B
+  mystr = mystr + TRANSF_MASK.format(bustopA, bustopB) + "\n"
+  # LV
+  if tipoDe == "y":
+    mystr = mystr + WINDING_1_MASK.format(nomede + "B", GROUND, R, X, vbaseDe) + "\n"
+  else:
+    mystr = mystr + WINDING_1_MASK.format(nomede + "B", nomede + "C", R, X, vbaseDe) + "\n"
+  # HV
+  if tipoPara == "y":
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "B", GROUND, R, X, vbasePara) + "\n"
+  else:
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "B", nomepara + "C", R, X, vbasePara) + "\n"
+
+  # fase C
+  mystr = mystr + TRANSF_MASK.format(bustopA, bustopC) + "\n"
+  # LV
+  if tipoDe == "y":
+    mystr = mystr + WINDING_1_MASK.format(nomede + "C", GROUND, R, X, vbaseDe) + "\n"
+  else:
+    mystr = mystr + WINDING_1_MASK.format(nomede + "C", nomede + "A", R, X, vbaseDe) + "\n"
+  # HV
+  if tipoPara == "y":
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "C", GROUND, R, X, vbasePara) + "\n"
+  else:
+    mystr = mystr + WINDING_2_MASK.format(nomepara + "C", nomepara + "A", R, X, vbasePara) + "\n"
+
+  # referencia para terra
+  if tipoDe == "d":
+    mystr = mystr + GROUND_RESIST_MASK.format(nomede + "A") + "\n"
+    mystr = mystr + GROUND_RESIST_MASK.format(nomede + "B") + "\n"
+    mystr = mystr + GROUND_RESIST_MASK.format(nomede + "C") + "\n"
+
+  if tipoPara == "d":
+    mystr = mystr + GROUND_RESIST_MASK.format(nomepara + "A") + "\n"
+    mystr = mystr + GROUND_RESIST_MASK.format(nomepara + "B") + "\n"
+    mystr = mystr + GROUND_RESIST_MASK.format(nomepara + "C") + "\n"
+
+  return mystr
+
+
+# ---------------------------------------------------------------------------
+# Geração de entradas
+# ---------------------------------------------------------------------------
+
+NAME_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .#-_"
+ACCENTED_CHARS = "ÁÉÍÓÚÂÊÔÃÕÇáéíóúâêôãõç"
+VOLTAGES = ["13.8", "138", "230", "345", "440", "500", "69.", "", "  1", "abc"]
+
+
+def randomNumberField(rand, width):
+  """
+  Campo numérico do Anafas com `width` colunas.
+  """
+  choice = rand.random()
+  if choice < 0.15:
+    text = ""
+  elif choice < 0.35:
+    # decimais implícitos
+    text = str(rand.randint(0, 10**width - 1))
+  elif choice < 0.55:
+    text = "{:.2f}".format(rand.uniform(-99, 999))
+  elif choice < 0.65:
+    # impedâncias muito pequenas
+    text = "{:.5f}".format(rand.random() / 1000)
+  elif choice < 0.75:
+    # impedâncias muito grandes, possivelmente em notação científica
+    text = "{:g}".format(rand.uniform(1E3, 1E9))
+  elif choice < 0.85:
+    text = rand.choice(["-", ".", "1.2.3", "abc", "+5", "1 2", "1E3", "0.", "-0", "  "])
+  else:
+    text = "{:.3f}".format(rand.uniform(0, 99))
+
+  text = text[:width]
+  return text.rjust(width) if rand.random() < 0.8 else text.ljust(width)
+
+
+def randomName(rand, length, accents = False):
+  chars = NAME_CHARS + (ACCENTED_CHARS if accents else "")
+  return "".join(rand.choice(chars) for i in range(length))
+
+
+def shorten(rand, line):
+  """
+  Corta a linha em uma posição aleatória em parte dos casos (linhas curtas).
+  """
+  if rand.random() < 0.3:
+    line = line[:rand.randint(0, len(line))]
+
+  return line + "\n"
+
+
+def randomDBarRow(rand, accents = False):
+  line = "{:>5}    {:12}          {:>4}".format(
+    rand.choice([str(rand.randint(1, 99999)), "", "x", str(rand.randint(-99, 0))]),
+    randomName(rand, 12, accents), rand.choice(VOLTAGES))
+  return shorten(rand, line)
+
+
+def randomDCirRow(rand):
+  line = "{:>5}  {:>5}  {:>2} {}{}{}{}".format(
+    str(rand.randint(0, 99999)), str(rand.randint(0, 99999)) if rand.random() < 0.9 else "",
+    str(rand.randint(0, 9)), *[randomNumberField(rand, 6) for i in range(4)])
+  return shorten(rand, line)
+
+
+def randomDeck(rand, nrows):
+  """
+  Texto de um caso com cartões em ordem aleatória, códigos numéricos de
+  cartão, comentários e cartões não lidos pelo conversor. Somente ASCII, para
+  ser lido igualmente em qualquer codificação padrão da plataforma.
+  """
+  comment = lambda: "(" + randomName(rand, rand.randint(0, 30)) + "\n"
+
+  def rows(generator):
+    lines = []
+    for i in range(rand.randint(0, nrows)):
+      if rand.random() < 0.1:
+        lines.append(comment())
+      lines.append(generator(rand))
+    return lines
+
+  segments = [
+    [rand.choice(["TITU\n", "  1\n"]), comment(), randomName(rand, 20) + "\n"],
+    [rand.choice(["TIPO\n", "  0\n"]), "   1\n"],
+    [rand.choice(["DBAR\n", " 38\n"])] + rows(randomDBarRow) + ["99999\n"],
+    [rand.choice(["DCIR\n", " 37\n"])] + rows(randomDCirRow) + ["99999\n"],
+    [rand.choice(["DMUT\n", " 39\n"])] + rows(randomDCirRow) + ["99999\n"],
+    [comment()],
+  ]
+  rand.shuffle(segments)
+
+  text = "".join(line for segment in segments for line in segment) + "FIM\n"
+  return text if rand.random() < 0.9 else text.rstrip("\n")
+
+
+# valores de borda para a formatação em largura fixa
+EDGE_VALUES = [0.0, -0.0, 1E-9, 6.348E-05, 1.5E-07, 0.005, 0.995, 99.995, 999.999, 123456.7,
+               999999.5, 1234567.0, 1E+20, 2.5E+16, -1E-05, -123456.789]
+
+
+def randomValue(rand):
+  """
+  Valor ôhmico entre 1E-9 e 1E10, com sinal, inteiros, zero e valores de borda.
+  """
+  choice = rand.random()
+  if choice < 0.1:
+    return rand.choice(EDGE_VALUES)
+  elif choice < 0.2:
+    return float(rand.randint(0, 10**rand.randint(1, 10)))
+
+  value = rand.uniform(1, 10) * 10**rand.randint(-9, 9)
+  return -value if rand.random() < 0.1 else value
+
+
+# ---------------------------------------------------------------------------
+# Elementos de referência do ATP (-r 1)
+# ---------------------------------------------------------------------------
+
+def branchNodes(line):
+  return sorted((line[2:8], line[8:14]))
+
+
+def resolveBranches(cards):
+  """
+  Substitui cada ramo de referência pelos dados do ramo referenciado, como
+  faz o ATP. O par de nós referenciado deve pertencer a exatamente um ramo
+  anterior; caso contrário, gera ValueError.
+  """
+  resolved = []
+  for card in cards:
+    lines = card.split("\n")
+    if lines[0][14:26].strip():
+      refnodes = sorted((lines[0][14:20], lines[0][20:26]))
+      matches = [earlier for earlier in resolved if branchNodes(earlier[0]) == refnodes]
+      if len(matches) != 1:
+        raise ValueError("{} ramos anteriores com os nós {}".format(len(matches), refnodes))
+
+      full = matches[0]
+      lines = [lines[0][:14] + full[0][14:44] + lines[0][44:], lines[1][:14] + full[1][14:], lines[2][:14]] + lines[3:]
+
+    resolved.append(lines)
+
+  return ["\n".join(lines) for lines in resolved]
+
+
+def transformerBustops(lines):
+  return [line[38:44] for line in lines if line.startswith("  TRANSFORMER ")]
+
+
+def resolveTransformers(cards):
+  """
+  Substitui cada trafo de referência pelos dados do trafo referenciado. O
+  bustop referenciado deve pertencer a exatamente um trafo anterior (entre os
+  bustops de todas as fases); caso contrário, gera ValueError.
+  """
+  resolved = []
+  for card in cards:
+    lines = card.split("\n")
+    refbus = lines[0][14:20]
+    if refbus.strip():
+      matches = [earlier for earlier in resolved if refbus in transformerBustops(earlier)]
+      if len(matches) != 1 or transformerBustops(matches[0]).count(refbus) != 1:
+        raise ValueError("bustop {} não é único entre os trafos anteriores".format(refbus))
+
+      # dados dos enrolamentos do trafo referenciado (sem cabeçalhos e 9999)
+      windings = [line[14:] for line in matches[0] if line.startswith((" 1", " 2"))]
+      bustopA = lines[0][38:44]
+      full = [lines[0][:14] + " " * 6 + lines[0][20:], "            9999"]
+      for line in lines[1:]:
+        if line.startswith("  TRANSFORMER "):
+          line = line[:14] + bustopA + line[20:]
+        elif line.startswith((" 1", " 2")):
+          line = line + windings.pop(0)
+        full.append(line)
+      lines = full
+
+    resolved.append(lines)
+
+  return ["\n".join(lines) for lines in resolved]
+
+
+def withRefs(printer, items):
+  refs = {}
+  return [printer(*(item + (refs,))) for item in items]
+
+
+def referenceDeck(rand, nrows):
+  """
+  Texto de um caso válido (DBAR antes do DCIR) com nomes de barra que
+  coincidem nos 5 primeiros caracteres, circuitos paralelos e impedâncias
+  repetidas, de modo a forçar referências ambíguas.
+  """
+  nbar = max(2, nrows // 3)
+  # o cartão TITU é fechado (e consumido) pela primeira linha após o título
+  lines = ["TITU\n", "CASO DE REFERENCIAS\n", "\n", "DBAR\n"]
+  for nb in range(1, nbar + 1):
+    name = rand.choice(["BARRA", "BARRA ", "BAR"]) + str(rand.randint(1, nbar))
+    lines.append("{:>5}    {:12}          {:>4}\n".format(nb, name, rand.choice(VOLTAGES[:3])))
+  lines.append("99999\n")
+
+  lines.append("DCIR\n")
+  values = ["{:.2f}".format(rand.uniform(0, 2)) for i in range(3)] + ["99999"]
+  for i in range(nrows):
+    de, para = rand.randint(0, nbar), rand.randint(0, nbar)
+    lines.append("{:>5}  {:>5}  {:>2} {:>6}{:>6}{:>6}{:>6}\n".format(
+      de, para, rand.randint(1, 3), *[rand.choice(values) for j in range(4)]))
+  lines.append("99999\n")
+  lines.append("FIM\n")
+
+  return "".join(lines)
+
+
+def streamed(filename):
+  outfile = filename + ".pch"
+  convertStream(filename, outfile, references = True)
+  with open(outfile) as f:
+    return f.read()
+
+
+def inMemory(filename):
+  ana = Anafas(filename)
+  return convertSources(ana.dcir, ana.dbar, references = True)
+
+
+# ---------------------------------------------------------------------------
+# Comparação
+# ---------------------------------------------------------------------------
+
+def outcome(function, args):
+  try:
+    return ("ok", function(*args))
+  except Exception as error:
+    return ("erro", type(error).__name__)
+
+
+def elapsed(function, inputs):
+  start = time.perf_counter()
+  for args in inputs:
+    try:
+      function(*args)
+    except Exception:
+      pass
+
+  return time.perf_counter() - start
+
+
+def compare(inputs, reference, candidate):
+  """
+  Aplica as duas implementações a cada entrada (tupla de argumentos).
+  Retorna as divergências (entrada, referência, atual) e a razão entre os
+  tempos da referência e da versão atual (> 1: versão atual mais rápida).
+  """
+  mismatches = []
+  for args in inputs:
+    expected = outcome(reference, args)
+    actual   = outcome(candidate, args)
+    if expected != actual:
+      mismatches.append((args, expected, actual))
+
+  tref = min(elapsed(reference, inputs) for i in range(3))
+  tcur = min(elapsed(candidate, inputs) for i in range(3))
+  return mismatches, tref / max(tcur, 1E-9)
+
+
+def readDeck(factory, filename):
+  ana = factory(filename)
+  return [vars(dbar) for dbar in ana.dbar], [vars(dcir) for dcir in ana.dcir]
+
+
+def checks(ncases, rand, tmpdir):
+  """
+  Lista de verificações: (nome, entradas, referência, versão atual).
+  """
+  dbars = []
+  for i in range(ncases):
+    line = randomDBarRow(rand, accents = True)
+    dbars.append((line, line.encode("latin-1")))
+
+  dcirs = []
+  for i in range(ncases):
+    line = randomDCirRow(rand)
+    dcirs.append((line, line.encode("latin-1")))
+
+  decks = []
+  for i in range(max(1, ncases // 200)):
+    filename = os.path.join(tmpdir, "caso{}.ANA".format(i))
+    with open(filename, "w") as f:
+      f.write(randomDeck(rand, 60))
+    decks.append((filename,))
+
+  numbers = [(randomValue(rand), rand.choice([6, 12])) for i in range(ncases)]
+
+  names = lambda: randomName(rand, rand.randint(1, 5)).replace(" ", "")
+  branches = [(names(), names(), randomValue(rand), randomValue(rand), randomValue(rand), randomValue(rand),
+               float(rand.choice(VOLTAGES[:7]))) for i in range(ncases)]
+
+  transformers = [(names(), names(), float(rand.choice(VOLTAGES[:7])), float(rand.choice(VOLTAGES[:7])),
+                   rand.choice("yd"), rand.choice("yd"), rand.randint(1, 150)) for i in range(ncases)]
+
+  # sequências de elementos com nomes, impedâncias e bustops repetidos, que
+  # forçam referências ambíguas
+  def branchList():
+    pool   = [names() for i in range(4)]
+    values = [round(rand.uniform(0, 100), rand.randint(0, 4)) for i in range(2)]
+    return (tuple((rand.choice(pool), rand.choice(pool), rand.choice(values), rand.choice(values), rand.choice(values),
+                   rand.choice(values), float(rand.choice(VOLTAGES[:2]))) for i in range(rand.randint(1, 30))),)
+
+  def transformerList():
+    return (tuple((names(), names(), float(rand.choice(VOLTAGES[:2])), float(rand.choice(VOLTAGES[:2])),
+                   rand.choice("yd"), rand.choice("yd"), rand.choice([1, 2, 100, 101, 1000]))
+                  for i in range(rand.randint(1, 30))),)
+
+  branchlists      = [branchList() for i in range(max(1, ncases // 20))]
+  transformerlists = [transformerList() for i in range(max(1, ncases // 20))]
+
+  refdecks = []
+  for i in range(max(1, ncases // 200)):
+    filename = os.path.join(tmpdir, "referencias{}.ANA".format(i))
+    with open(filename, "w") as f:
+      f.write(referenceDeck(rand, 60))
+    refdecks.append((filename,))
+
+  return [
+    ("DBar (texto)", dbars, lambda s, b: vars(RefDBar(s)), lambda s, b: vars(DBar(s))),
+    ("DBar (bytes)", dbars, lambda s, b: vars(RefDBar(s)), lambda s, b: vars(DBar(b, "latin-1"))),
+    ("DCir (texto)", dcirs, lambda s, b: vars(RefDCir(s)), lambda s, b: vars(DCir(s))),
+    ("DCir (bytes)", dcirs, lambda s, b: vars(RefDCir(s)), lambda s, b: vars(DCir(b))),
+    ("cartões (texto)", decks, lambda f: readDeck(RefAnafas, f), lambda f: readDeck(Anafas, f)),
+    ("cartões (bytes)", decks, lambda f: readDeck(RefAnafas, f), lambda f: readDeck(lambda g: Anafas(g, "latin-1"), f)),
+    ("__fixedWidthNumber", numbers, refFixedWidthNumber, fixedWidthNumber),
+    ("printBranch", branches, refPrintBranch, printBranch),
+    ("printTransformer", transformers, refPrintTransformer, printTransformer),
+    ("printBranch (refs)", branchlists, lambda items: [refPrintBranch(*item) for item in items],
+     lambda items: resolveBranches(withRefs(printBranch, items))),
+    ("printTransformer (refs)", transformerlists, lambda items: [refPrintTransformer(*item) for item in items],
+     lambda items: resolveTransformers(withRefs(printTransformer, items))),
+    ("convertStream (refs)", refdecks, inMemory, streamed),
+  ]
+
+
+def run(ncases = 5000, seed = 0, out = sys.stdout):
+  """
+  Executa todas as verificações. Retorna o número total de divergências.
+  """
+  rand = random.Random(seed)
+  total = 0
+
+  with tempfile.TemporaryDirectory() as tmpdir:
+    for name, inputs, reference, candidate in checks(ncases, rand, tmpdir):
+      mismatches, ratio = compare(inputs, reference, candidate)
+      total = total + len(mismatches)
+      out.write("{:24} {:6} casos {:6} divergências {:6.2f}x\n".format(name, len(inputs), len(mismatches), ratio))
+
+      for args, expected, actual in mismatches[:3]:
+        out.write("  entrada:    {!r}\n  referência: {!r}\n  atual:      {!r}\n".format(args, expected, actual))
+
+  return total
+
+
+if __name__ == "__main__":
+  myargs = getopts(sys.argv)
+  mismatches = run(int(myargs.get('-n', 5000)), int(myargs.get('-seed', 0)))
+  sys.exit(1 if mismatches else 0)
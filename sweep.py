@@ -0,0 +1,154 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Varredura de parâmetros de conversão (xopt, freq, sbase, Zmax, estilo) a
+partir de um único caso lido.
+"""
+
+from convert import *
+import convert
+import itertools
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
+def sweepGrid(xopt = (60.0,), freq = (60.0,), sbase = (100,), Zmax = (5,), style = (MD_HAMILTON,)):
+  """
+  Produto cartesiano dos valores de cada parâmetro. Cada variante é um
+  dicionário com as chaves xopt, freq, sbase, Zmax e style.
+  """
+  keys = ("xopt", "freq", "sbase", "Zmax", "style")
+  return [dict(zip(keys, values)) for values in itertools.product(xopt, freq, sbase, Zmax, style)]
+
+
+def __scaleImpedances(pct, znum, variants):
+  """
+  Valores ôhmicos de todos os circuitos para todas as variantes. `pct` tem as
+  impedâncias (r1, x1, r0, x0) em % e `znum` o termo (vbase*1E3)**2 de cada
+  circuito. As operações seguem a ordem de ohmicValues, de modo que os
+  resultados são idênticos aos da conversão simples.
+  """
+  sbases  = [variant["sbase"] * 1E6 for variant in variants]
+  factors = [impedanceFactor(variant["xopt"], variant["freq"]) for variant in variants]
+
+  if numpy is not None and len(znum) > 0:
+    pu = numpy.array(pct, dtype = float).T / 100.0                          # (4, N)
+    zbase = numpy.array(znum)[None, :] / numpy.array(sbases)[:, None]      # (V, N)
+    ohms = pu[None, :, :] * zbase[:, None, :] * numpy.array(factors)[:, None, None]
+    return [list(zip(*values.tolist())) for values in ohms]
+
+  scaled = []
+  for sb, factor in zip(sbases, factors):
+    scaled.append([tuple(value / 100.0 * (zn / sb) * factor for value in values)
+                   for values, zn in zip(pct, znum)])
+
+  return scaled
+
+
+def convertSweep(ana, variants, suggestions = None):
+  """
+  Converte o caso para cada variante, retornando um deck (string) por
+  variante. Leitura, tabela de barras, resolução de nomes e classificação
+  (uma por valor distinto de Zmax) são compartilhadas entre as variantes.
+  """
+  ldcir = ana.dcir
+  buses = busTable(ana.dbar)
+
+  # nomes e tensão base de cada circuito, independentes dos parâmetros
+  names = []
+  for dcir in ldcir:
+    if (dcir.de == 0 and dcir.para != 0) or (dcir.para == 0 and dcir.de != 0):
+      names.append(sourceNames(dcir, buses, suggestions))
+    else:
+      names.append(buses.get(dcir.de, UNKNOWN_BUS) + buses.get(dcir.para, UNKNOWN_BUS))
+
+  vbases = [name[1] for name in names]
+  pct  = [(dcir.r1, dcir.x1, dcir.r0, dcir.x0) for dcir in ldcir]
+  znum = [(vbase*1E3)**2 for vbase in vbases]
+  scaled = __scaleImpedances(pct, znum, variants)
+
+  classified = {}
+  decks = []
+  for variant, ohms in zip(variants, scaled):
+    Zmax = variant["Zmax"]
+    if Zmax not in classified:
+      kinds = [classifyCircuit(dcir, buses, Zmax) for dcir in ldcir]
+      classified[Zmax] = (kinds, transformerNumbers(kinds))
+    kinds, trnums = classified[Zmax]
+
+    sources = []
+    series  = []
+    for kind, trnum, name, values in zip(kinds, trnums, names, ohms):
+      if CL_SOURCE == kind:
+        sources.append(printSource(*(name + tuple(values)), style = variant["style"]))
+      elif kind in SERIES_KINDS:
+        denome, devbase, paranome, paravbase = name
+        series.append(printSeries(kind, denome, paranome, devbase, paravbase, *values, trnum = trnum))
+
+    decks.append("".join(sources + series))
+
+  return decks
+
+
+def variantName(variant):
+  return "xopt{:g}_f{:g}_s{:g}_z{:g}_md{}".format(
+    variant["xopt"], variant["freq"], variant["sbase"], variant["Zmax"], variant["style"])
+
+
+def writeSweep(ana, variants, prefix, suggestions = None, ext = ".pch"):
+  """
+  Grava um deck por variante, em arquivos "<prefix>_<variante><ext>".
+  Retorna os arquivos gravados.
+  """
+  written = []
+  for variant, deck in zip(variants, convertSweep(ana, variants, suggestions)):
+    outfile = "{}_{}{}".format(prefix, variantName(variant), ext)
+    with open_file(outfile, "w") as outf:
+      outf.write(deck)
+    written.append(outfile)
+
+  return written
+
+
+if __name__ == "__main__":
+  from sys import argv
+
+  values = lambda key, default, cast: [cast(value) for value in myargs.get(key, default).split(",")]
+
+  myargs = getopts(argv)
+  if '-i' in myargs and '-o' in myargs:
+    variants = sweepGrid(
+      xopt  = values('-xopt', "60", float),
+      freq  = values('-freq', "60", float),
+      sbase = values('-sbase', "100", float),
+      Zmax  = values('-Zmax', "5", float),
+      style = values('-md', str(convert.md), int))
+
+    for outfile in writeSweep(Anafas(myargs['-i']), variants, myargs['-o']):
+      print(outfile)
+
+  else:
+    print("uso: sweep.py -i <caso.ANA> -o <prefixo> [-xopt 60,0] [-freq 60] [-sbase 100] [-Zmax 5,10] [-md 0,1]")
@@ -0,0 +1,190 @@
+"""
+MIT License
+
+Copyright (c) 2019 David Rodrigues Parrini
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Topologia dos circuitos do Anafas: ilhas elétricas e conversão por ilha.
+"""
+
+from convert import *
+import convert
+from concurrent.futures import ProcessPoolExecutor
+
+
+class UnionFind:
+  """
+  Conjuntos disjuntos de barras (union-find com compressão de caminho).
+  """
+
+  def __init__(self):
+    self.parent = {}
+
+  def find(self, node):
+    self.parent.setdefault(node, node)
+    while self.parent[node] != node:
+      # compressão de caminho por divisão (path halving)
+      self.parent[node] = self.parent[self.parent[node]]
+      node = self.parent[node]
+
+    return node
+
+  def union(self, node1, node2):
+    root1 = self.find(node1)
+    root2 = self.find(node2)
+    if root1 != root2:
+      self.parent[root2] = root1
+
+
+def findIslands(ldcir):
+  """
+  Rotula as ilhas elétricas formadas pelos circuitos. Retorna um dicionário
+  barra -> ilha, com ilhas numeradas a partir de 1 na ordem em que aparecem
+  no DCIR. A terra (barra 0) não conecta ilhas.
+  """
+  sets = UnionFind()
+  for dcir in ldcir:
+    if dcir.de != 0:
+      sets.find(dcir.de)
+    if dcir.para != 0:
+      sets.find(dcir.para)
+    if dcir.de != 0 and dcir.para != 0:
+      sets.union(dcir.de, dcir.para)
+
+  labels = {}
+  islands = {}
+  for node in sets.parent:
+    root = sets.find(node)
+    if root not in labels:
+      labels[root] = len(labels) + 1
+    islands[node] = labels[root]
+
+  return islands
+
+
+def circuitIslands(ldcir, islands):
+  """
+  Ilha de cada circuito (0 para circuitos entre terra e terra).
+  """
+  return [islands.get(dcir.de if dcir.de != 0 else dcir.para, 0) for dcir in ldcir]
+
+
+def floatingIslands(ldcir, kinds, islands):
+  """
+  Ilhas sem nenhuma fonte convertida (CL_SOURCE), em ordem crescente.
+  """
+  sourced = set()
+  for dcir, kind, island in zip(ldcir, kinds, circuitIslands(ldcir, islands)):
+    if CL_SOURCE == kind:
+      sourced.add(island)
+
+  return sorted(set(islands.values()) - sourced)
+
+
+def groupCircuits(ldcir, kinds, labels, buses):
+  """
+  Agrupa os circuitos convertidos (kind != CL_IGNORED) pelo rótulo de cada
+  circuito. Retorna, em ordem crescente de rótulo, triplas (rótulo, itens,
+  barras), com itens (índice no DCIR, circuito, kind, trnum) e a tabela das
+  barras do grupo. A numeração dos trafos fictícios é global.
+  """
+  groups = {}
+  for index, (dcir, kind, trnum, label) in enumerate(zip(ldcir, kinds, transformerNumbers(kinds), labels)):
+    if CL_IGNORED != kind:
+      items, groupbuses = groups.setdefault(label, ([], {}))
+      items.append((index, dcir, kind, trnum))
+      for node in (dcir.de, dcir.para):
+        if node in buses:
+          groupbuses[node] = buses[node]
+
+  return [(label,) + groups[label] for label in sorted(groups)]
+
+
+def mapGroups(function, tasks, workers = 1):
+  """
+  Aplica `function` a cada tupla de argumentos de `tasks`, opcionalmente em
+  processos paralelos. Retorna os resultados na ordem de `tasks`.
+  """
+  if workers > 1 and len(tasks) > 1:
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+      futures = [executor.submit(function, *args) for args in tasks]
+      return [future.result() for future in futures]
+
+  return [function(*args) for args in tasks]
+
+
+def __convertIsland(items, buses, suggestions, sbase, factor, style):
+  """
+  Converte os circuitos de uma ilha. Retorna pares (índice global, cartões).
+  """
+  return [(index, circuitCards(dcir, kind, buses, suggestions, sbase, factor, trnum, style))
+          for index, dcir, kind, trnum in items]
+
+
+def convertIslands(ldcir, ldbar, suggestions = None, Zmax = 5, sbase = 100, xopt = 60.0, freq = 60.0,
+                   dropFloating = False, workers = 1):
+  """
+  Converte cada ilha separadamente, opcionalmente em processos paralelos, e
+  junta os cartões na ordem de __convertSources (fontes e depois ramos, na
+  ordem do DCIR). A numeração dos trafos fictícios é global, de modo que sem
+  dropFloating o resultado é idêntico ao de __convertSources.
+  """
+  buses   = busTable(ldbar)
+  factor  = impedanceFactor(xopt, freq)
+  kinds   = [classifyCircuit(dcir, buses, Zmax) for dcir in ldcir]
+  islands = findIslands(ldcir)
+  labels  = circuitIslands(ldcir, islands)
+
+  if dropFloating:
+    floating = set(floatingIslands(ldcir, kinds, islands))
+    kinds = [CL_IGNORED if label in floating else kind for kind, label in zip(kinds, labels)]
+
+  # circuitos convertidos agrupados por ilha, com a tabela de barras da ilha
+  tasks = [(items, islandbuses, suggestions, sbase, factor, convert.md)
+           for label, items, islandbuses in groupCircuits(ldcir, kinds, labels, buses)]
+  cards = {}
+  for result in mapGroups(__convertIsland, tasks, workers):
+    cards.update(result)
+
+  sources = [cards[index] for index in sorted(cards) if CL_SOURCE == kinds[index]]
+  series  = [cards[index] for index in sorted(cards) if kinds[index] in SERIES_KINDS]
+  return "".join(sources + series)
+
+
+if __name__ == "__main__":
+  from sys import argv
+  myargs = getopts(argv)
+  if '-i' in myargs:
+    ana = Anafas(myargs['-i'])
+
+    buses   = busTable(ana.dbar)
+    kinds   = [classifyCircuit(dcir, buses) for dcir in ana.dcir]
+    islands = findIslands(ana.dcir)
+    floating = floatingIslands(ana.dcir, kinds, islands)
+    print("{} ilhas, {} sem fonte: {}".format(len(set(islands.values())), len(floating), floating))
+
+    if '-o' in myargs:
+      conv = convertIslands(ana.dcir, ana.dbar, dropFloating = myargs.get('-drop') == "1",
+                            workers = int(myargs.get('-j', 1)))
+      with open_file(myargs['-o'], "w") as outf:
+        outf.write(conv)
+
+  else:
+    print("uso: topology.py -i <caso.ANA> [-o <saida.pch>] [-drop 1] [-j <processos>]")